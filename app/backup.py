@@ -0,0 +1,241 @@
+# backup.py
+# 在线备份 usage_data.db：使用 SQLite 备份 API 分小步复制，每步之后在 progress 回调中休眠，
+# 不会长时间锁住数据库，采集进程的写入最多只会等待一个复制步骤
+# 复制期间源库被写入时 SQLite 会让备份从头开始，重来次数过多时改为一步复制完，保证备份能结束
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+
+class _TooManyRestarts(Exception):
+    """在 progress 回调中抛出，中止分步复制"""
+
+
+def backup_database(db_file, dest_file, pages=16, sleep=0.005, max_restarts=3):
+    """
+    把 db_file 在线备份到 dest_file
+    :param pages: 每一步复制的页数，越小对写入的影响越小
+    :param sleep: 每一步之后的休眠时间（秒），期间不持有任何锁；
+                  sqlite3 自带的 sleep 参数只在 SQLITE_BUSY / SQLITE_LOCKED 时生效，所以在 progress 回调中休眠
+    :param max_restarts: 因源库被写入而从头开始超过这么多次后，改为一步复制完
+                         （WAL 模式下一步复制只持有读事务，同样不阻塞写入）
+    :return: 统计 {"steps": 步数, "restarts": 重来次数, "single_step": 是否改为一步复制}
+    """
+    stats = {"steps": 0, "restarts": 0, "single_step": False}
+    last_remaining = None
+
+    def progress(status, remaining, total):
+        nonlocal last_remaining
+        stats["steps"] += 1
+        if last_remaining is not None and remaining > last_remaining:
+            stats["restarts"] += 1
+            if stats["restarts"] > max_restarts:
+                raise _TooManyRestarts()
+        last_remaining = remaining
+        if remaining and sleep > 0:
+            time.sleep(sleep)
+
+    src = sqlite3.connect(db_file)
+    dst = sqlite3.connect(dest_file)
+    try:
+        try:
+            src.backup(dst, pages=pages, progress=progress)
+        except _TooManyRestarts:
+            stats["single_step"] = True
+            src.backup(dst, pages=-1)
+            stats["steps"] += 1
+    finally:
+        dst.close()
+        src.close()
+    return stats
+
+
+def verify_backup(dest_file):
+    """
+    检查备份文件的完整性
+    :return: (是否通过, 说明)
+    """
+    conn = sqlite3.connect(dest_file)
+    try:
+        result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+        if result != "ok":
+            return False, result
+        conn.execute("SELECT COUNT(*) FROM app_usage").fetchone()
+        return True, "ok"
+    except sqlite3.Error as e:
+        return False, str(e)
+    finally:
+        conn.close()
+
+
+class BackupJob:
+    """
+    定期备份任务，可直接注册到 monitor.add_periodic_job（在线程池中执行，不阻塞事件循环）
+    备份文件按时间命名并轮换，只保留最近 keep 份
+    """
+
+    def __init__(self, db_file="usage_data.db", backup_dir="backups", keep=7, pages=16, sleep=0.005):
+        self.db_file = db_file
+        self.backup_dir = backup_dir
+        self.keep = keep
+        self.pages = pages
+        self.sleep = sleep
+        self.prefix = os.path.splitext(os.path.basename(db_file))[0] + "-"
+        self.last_stats = None  # 最近一次备份的 backup_database 统计
+
+    def __call__(self):
+        return self.run()
+
+    def run(self):
+        """
+        执行一次备份：先写入临时文件，校验通过后再改名，最后清理旧备份
+        :return: 备份文件路径，失败时返回 None
+        """
+        os.makedirs(self.backup_dir, exist_ok=True)
+        name = f"{self.prefix}{datetime.now().strftime('%Y%m%d-%H%M%S')}.db"
+        dest_file = os.path.join(self.backup_dir, name)
+        tmp_file = dest_file + ".tmp"
+
+        try:
+            self.last_stats = backup_database(self.db_file, tmp_file, self.pages, self.sleep)
+            ok, message = verify_backup(tmp_file)
+            if not ok:
+                print(f"Backup verify error: {message}")
+                os.remove(tmp_file)
+                return None
+            os.replace(tmp_file, dest_file)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Backup error: {e}")
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            return None
+
+        self.rotate()
+        return dest_file
+
+    def generations(self):
+        """已有的备份文件，按时间从旧到新排列"""
+        if not os.path.isdir(self.backup_dir):
+            return []
+        names = sorted(n for n in os.listdir(self.backup_dir)
+                       if n.startswith(self.prefix) and n.endswith(".db"))
+        return [os.path.join(self.backup_dir, n) for n in names]
+
+    def due_in(self, interval: float) -> float:
+        """
+        距离下一次备份的秒数，按最新一份备份的修改时间计算，采集进程重启后不必从头等待
+        :return: 从没备份过或最新备份已超过 interval 秒时为 0
+        """
+        generations = self.generations()
+        if not generations:
+            return 0.0
+        try:
+            age = time.time() - os.path.getmtime(generations[-1])
+        except OSError:
+            return 0.0
+        # 系统时间被调回时 age 可能为负，最多等一个完整间隔
+        return min(max(interval - age, 0.0), interval)
+
+    def rotate(self):
+        """删除超出保留数量的旧备份"""
+        generations = self.generations()
+        for path in generations[:max(len(generations) - self.keep, 0)]:
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"Remove backup error: {e}")
+
+
+def simulate(seconds=10.0, write_interval=0.01, rows=20000, pages=16, sleep=0.005):
+    """
+    本地验证：模拟正在持续写入的监控器，同时反复备份，统计写入延迟
+    使用 AppUsageMonitor 自己的 flush 写入路径，但不启动采样
+    """
+    import tempfile
+    from datetime import timedelta
+    from statictis import AppUsageMonitor
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "usage_data.db")
+        monitor = AppUsageMonitor(db_file)
+
+        # 预先写入一些历史数据，让备份需要多个步骤才能完成
+        today = datetime.now()
+        conn = sqlite3.connect(db_file)
+        with conn:
+            conn.executemany("INSERT INTO app_usage (app_name, date, usage_time) VALUES (?, ?, ?)",
+                             [(f"app{i % 500}.exe", (today - timedelta(days=i // 500 + 1)).strftime("%Y-%m-%d"), 60.0)
+                              for i in range(rows)])
+        conn.close()
+
+        latencies = []
+        stopped = threading.Event()
+
+        def writer():
+            i = 0
+            while not stopped.is_set():
+                monitor._record(f"app{i % 50}.exe", 1.0)
+                start = time.perf_counter()
+                monitor.flush()
+                latencies.append(time.perf_counter() - start)
+                i += 1
+                time.sleep(write_interval)
+
+        thread = threading.Thread(target=writer, daemon=True)
+        thread.start()
+
+        job = BackupJob(db_file, os.path.join(tmp, "backups"), keep=3, pages=pages, sleep=sleep)
+        durations = []
+        failures = 0
+        totals = {"steps": 0, "restarts": 0, "single_step": 0}
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            if job.run() is None:
+                failures += 1
+            durations.append(time.perf_counter() - start)
+            for key, value in (job.last_stats or {}).items():
+                totals[key] += value
+            time.sleep(0.2)
+
+        stopped.set()
+        thread.join()
+
+        latencies.sort()
+        p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0
+        print(f"backups: {len(durations)} (failed {failures}), kept {len(job.generations())}, "
+              f"avg {sum(durations) / max(len(durations), 1) * 1000:.1f} ms, max {max(durations, default=0) * 1000:.1f} ms")
+        print(f"steps: {totals['steps']}, restarts: {totals['restarts']}, "
+              f"finished in a single step: {totals['single_step']}")
+        print(f"writes: {len(latencies)}, p99 {p99 * 1000:.2f} ms, max {latencies[-1] * 1000:.2f} ms")
+
+
+def main(argv=None):
+    """
+    手动执行一次备份，或使用 --simulate 在本地验证对写入的影响
+    """
+    parser = argparse.ArgumentParser(description="Screen Time database backup")
+    parser.add_argument("--db", default="usage_data.db", help="数据库文件路径")
+    parser.add_argument("--dir", default="backups", help="备份目录")
+    parser.add_argument("--keep", type=int, default=7, help="保留的备份份数")
+    parser.add_argument("--pages", type=int, default=16, help="每一步复制的页数")
+    parser.add_argument("--sleep", type=float, default=0.005, help="每一步之后的休眠时间（秒）")
+    parser.add_argument("--simulate", type=float, metavar="SECONDS",
+                        help="模拟持续写入的监控器并反复备份，输出写入延迟统计")
+    parser.add_argument("--write-interval", type=float, default=0.01, help="模拟时的写入间隔（秒）")
+    args = parser.parse_args(argv)
+
+    if args.simulate:
+        simulate(args.simulate, args.write_interval, pages=args.pages, sleep=args.sleep)
+        return
+
+    path = BackupJob(args.db, args.dir, args.keep, args.pages, args.sleep).run()
+    if path:
+        print(f"Backup written to {path}")
+
+
+if __name__ == "__main__":
+    main()
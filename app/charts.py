@@ -0,0 +1,59 @@
+# charts.py
+# 使用情况图表的绘制与样式，界面中的详细图表和批量报告共用
+# 这里只操作传入的 Figure / Axes，不导入 pyplot，也不选择绘图后端
+import matplotlib
+
+FIGURE_SIZE = (10, 6)
+
+
+def setup_fonts():
+    """
+    设置中文字体支持
+    """
+    matplotlib.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'Arial Unicode MS']
+    matplotlib.rcParams['axes.unicode_minus'] = False
+
+
+def draw_usage_chart(fig, ax, usage_data, title='Weekly App Usage', top_n=10):
+    """
+    绘制应用使用时长水平条形图
+    :param usage_data: 应用使用数据字典 {应用名: 使用时间（秒）}
+    :param title: 图表标题
+    :param top_n: 只显示使用时间最多的前 N 个应用
+    """
+    # 按使用时间排序并取前10个应用
+    top_apps = dict(sorted(usage_data.items(), key=lambda x: x[1], reverse=True)[:top_n])
+
+    fig.patch.set_facecolor('#F5F5F7')  # 苹果浅灰背景
+
+    # 准备数据
+    apps = list(top_apps.keys())
+    times = [t / 60 for t in top_apps.values()]
+
+    # 创建水平条形图
+    bars = ax.barh(range(len(apps)), times, color='#007AFF', height=0.7)
+
+    # 设置Y轴标签
+    ax.set_yticks(range(len(apps)))
+    ax.set_yticklabels(apps)
+
+    # 设置图表样式
+    ax.set_xlabel('Minutes', fontsize=12, color='#333333')
+    ax.set_title(title, fontsize=16, pad=20, color='#333333')
+    ax.grid(axis='x', alpha=0.3, color='#CCCCCC')
+    ax.set_facecolor('#FFFFFF')
+
+    # 设置坐标轴颜色
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    ax.spines['bottom'].set_color('#CCCCCC')
+    ax.spines['left'].set_color('#CCCCCC')
+    ax.tick_params(colors='#333333')
+
+    # 在条形图上显示数值
+    for bar, time_val in zip(bars, times):
+        ax.text(bar.get_width() + 0.1, bar.get_y() + bar.get_height() / 2,
+                f'{time_val:.1f}m', va='center', fontsize=10, color='#333333')
+
+    # 反转Y轴使最长的应用在最上面
+    ax.invert_yaxis()
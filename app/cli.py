@@ -0,0 +1,173 @@
+# cli.py
+# 命令行查询工具：只读打开 usage_data.db，只依赖标准库，启动时间远小于 100ms
+# 注意：这里不能导入 gui / statictis（会拉起 PySide6、matplotlib 和 pywin32）
+import argparse
+import os
+import sqlite3
+import sys
+from datetime import date, timedelta
+
+from formatting import format_time
+from period_cache import period_bounds, period_of
+
+
+def connect_readonly(db_file):
+    """以只读方式打开数据库，文件不存在时不会创建新文件"""
+    # 手动拼接 URI，避免为此导入 pathlib / urllib 拖慢启动
+    path = os.path.abspath(db_file).replace("\\", "/")
+    for char, escaped in (("%", "%25"), ("?", "%3f"), ("#", "%23")):
+        path = path.replace(char, escaped)
+    if not path.startswith("/"):
+        path = "/" + path
+    return sqlite3.connect(f"file://{path}?mode=ro", uri=True)
+
+
+def query_usage(conn, start_date, end_date):
+    """返回区间内各应用总时长，按时长降序排列 [(应用名, 秒)]"""
+    cursor = conn.execute(
+        'SELECT app_name, SUM(usage_time) AS total FROM app_usage '
+        'WHERE date BETWEEN ? AND ? GROUP BY app_name ORDER BY total DESC',
+        (start_date, end_date))
+    return cursor.fetchall()
+
+
+def query_rows(conn, start_date, end_date):
+    """返回区间内的原始记录 [(日期, 应用名, 秒)]"""
+    cursor = conn.execute(
+        'SELECT date, app_name, usage_time FROM app_usage '
+        'WHERE date BETWEEN ? AND ? ORDER BY date, usage_time DESC',
+        (start_date, end_date))
+    return cursor.fetchall()
+
+
+def parse_date(value):
+    """校验 YYYY-MM-DD 格式的日期"""
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date: {value!r}, expected YYYY-MM-DD")
+
+
+def positive_int(value):
+    """校验大于 0 的整数"""
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"invalid count: {value!r}, expected a positive integer")
+    return number
+
+
+def resolve_range(args):
+    """根据子命令计算查询的日期区间"""
+    today = date.today()
+    if args.command == "today":
+        return today.isoformat(), today.isoformat()
+    if args.command == "week":
+        # 与界面和报告保持一致：本周（从周一开始，到周日为止）
+        return period_bounds(period_of("week", today))
+    start = args.start or (today - timedelta(days=6)).isoformat()
+    end = args.end or today.isoformat()
+    return start, end
+
+
+def print_usage(rows, start_date, end_date, as_json):
+    if as_json:
+        import json
+        json.dump({"start": start_date, "end": end_date,
+                   "apps": [{"app_name": name, "usage_time": total} for name, total in rows]},
+                  sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write("\n")
+        return
+
+    total_seconds = sum(total for _, total in rows)
+    print(f"{start_date} ~ {end_date}  total {format_time(total_seconds)}")
+    if not rows:
+        print("No app usage data available")
+        return
+    width = max(len(name) for name, _ in rows)
+    for name, total in rows:
+        print(f"  {name:<{width}}  {format_time(total):>8}")
+
+
+def export_rows(rows, fmt, output):
+    if fmt == "json":
+        import json
+        json.dump([{"date": d, "app_name": name, "usage_time": t} for d, name, t in rows],
+                  output, ensure_ascii=False, indent=2)
+        output.write("\n")
+    else:
+        import csv
+        writer = csv.writer(output, lineterminator="\n")
+        writer.writerow(["date", "app_name", "usage_time"])
+        writer.writerows(rows)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Screen Time command-line query tool")
+    parser.add_argument("--db", default="usage_data.db", help="数据库文件路径（只读打开）")
+    parser.add_argument("--json", action="store_true", help="以 JSON 格式输出")
+    # 子命令也接受 --json，写在子命令前后都可以；SUPPRESS 避免子命令覆盖写在前面的值
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--json", action="store_true", default=argparse.SUPPRESS, help="以 JSON 格式输出")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("today", parents=[common], help="今日各应用使用时长")
+    sub.add_parser("week", parents=[common], help="本周（周一至周日）各应用使用时长")
+
+    range_parser = sub.add_parser("range", parents=[common], help="指定日期区间内各应用使用时长")
+    range_parser.add_argument("start", type=parse_date)
+    range_parser.add_argument("end", type=parse_date)
+
+    top_parser = sub.add_parser("top", parents=[common], help="使用时长最多的前 N 个应用（默认最近 7 天）")
+    top_parser.add_argument("n", type=positive_int, nargs="?", default=10)
+    top_parser.add_argument("--start", type=parse_date)
+    top_parser.add_argument("--end", type=parse_date)
+
+    export_parser = sub.add_parser("export", parents=[common], help="导出原始记录（默认最近 7 天）")
+    export_parser.add_argument("--start", type=parse_date)
+    export_parser.add_argument("--end", type=parse_date)
+    export_parser.add_argument("--format", choices=["csv", "json"],
+                               help="导出格式，默认 csv，指定 --json 时为 json")
+    export_parser.add_argument("-o", "--output", help="输出文件，默认输出到标准输出")
+    return parser
+
+
+def main(argv=None):
+    """
+    命令行入口
+    """
+    args = build_parser().parse_args(argv)
+    start_date, end_date = resolve_range(args)
+
+    try:
+        conn = connect_readonly(args.db)
+        try:
+            if args.command == "export":
+                rows = query_rows(conn, start_date, end_date)
+            else:
+                rows = query_usage(conn, start_date, end_date)
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Cannot read {args.db}: {e}", file=sys.stderr)
+        return 1
+
+    if args.command == "export":
+        fmt = args.format or ("json" if args.json else "csv")
+        if args.output:
+            with open(args.output, "w", encoding="utf-8", newline="") as f:
+                export_rows(rows, fmt, f)
+        else:
+            export_rows(rows, fmt, sys.stdout)
+        return 0
+
+    if args.command == "top":
+        rows = rows[:args.n]
+    print_usage(rows, start_date, end_date, args.json)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+# collector.py
+# 无界面的常驻采集进程：负责采样和写库，并通过本地 IPC 提供查询
+# 注意：这里不能导入任何 GUI 模块（PySide6 / matplotlib）
+import argparse
+import importlib
+import os
+import sys
+import threading
+
+from ipc import HOST, PORT, UsageServer, remove_endpoint, runtime_dir, write_endpoint
+
+LOCK_FILE = "collector.lock"
+
+
+def acquire_instance_lock():
+    """
+    锁住当前用户的锁文件，保证同一时间只运行一个采集进程；进程退出时由操作系统释放
+    :return: 打开的锁文件，需要一直保持打开；已有采集进程在运行时返回 None
+    """
+    f = open(os.path.join(runtime_dir(), LOCK_FILE), "a+b")
+    try:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+def main(argv=None) -> int:
+    """
+    采集进程入口
+    :return: 进程退出码，启动失败或服务异常退出时非 0
+    """
+    parser = argparse.ArgumentParser(description="Screen Time collector")
+    parser.add_argument("--db", default="usage_data.db", help="数据库文件路径")
+    parser.add_argument("--rules", help="规则文件路径，默认为数据库所在目录下的 rules.json，不存在时使用默认规则")
+    parser.add_argument("--backup-dir", default="backups", help="备份目录")
+    parser.add_argument("--backup-interval", type=float, default=6 * 3600,
+                        help="在线备份间隔（秒），0 表示不备份")
+    parser.add_argument("--backup-keep", type=int, default=7, help="保留的备份份数")
+    parser.add_argument("--plugin", action="append", default=[], metavar="MODULE",
+                        help="加载插件模块（模块需提供 register(manager) 函数），可重复指定")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT, help="监听端口，默认由系统分配并写入端点文件")
+    args = parser.parse_args(argv)
+
+    # 同一时间只运行一个采集进程；用锁文件而不是 ping，两个进程同时启动时也只有一个能拿到锁
+    lock = acquire_instance_lock()
+    if lock is None:
+        print("Collector is already running", file=sys.stderr)
+        return 1
+
+    from plugins import PluginManager
+    from rules import RuleEngine
+    from statictis import AppUsageMonitor
+
+    plugins = None
+    if args.plugin:
+        plugins = PluginManager()
+        for module_name in args.plugin:
+            importlib.import_module(module_name).register(plugins)
+
+    stopped = threading.Event()
+    rules_file = args.rules or os.path.join(os.path.dirname(os.path.abspath(args.db)), "rules.json")
+    monitor = AppUsageMonitor(args.db, rules=RuleEngine.from_file(rules_file), plugins=plugins)
+    server = UsageServer(monitor, args.host, args.port, on_stop=stopped.set)
+    try:
+        # 先绑定端口再开始记录，端口不可用时直接退出
+        server.bind()
+    except OSError as e:
+        print(f"Cannot listen on {args.host}:{args.port}: {e}", file=sys.stderr)
+        return 1
+    monitor.add_service(server.serve)
+    if args.backup_interval > 0:
+        from backup import BackupJob
+        job = BackupJob(args.db, args.backup_dir, args.backup_keep)
+        # 接着上一份备份的时间排期，最新备份已过期时启动后立即备份
+        monitor.add_periodic_job(args.backup_interval, job, first_delay=job.due_in(args.backup_interval))
+    monitor.start_monitoring()
+    # 服务已在监听，公布端口和令牌，界面和命令行通过端点文件连接
+    write_endpoint(args.host, server.port, server.token)
+
+    status = 0
+    try:
+        # 带超时等待，保证 Ctrl+C 能及时响应
+        while not stopped.wait(1.0):
+            if not monitor.monitor_thread.is_alive():
+                # 查询服务等出错退出，监控已经停止
+                print("Collector stopped unexpectedly", file=sys.stderr)
+                status = 1
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        remove_endpoint(server.token)
+        monitor.stop_monitoring()
+        if plugins is not None:
+            # 让插件处理完最后一次写入的事件
+            plugins.shutdown()
+        lock.close()
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,18 @@
+# formatting.py
+# 界面和命令行共用的显示格式，只依赖标准库
+
+
+def format_time(seconds):
+    """
+    格式化时间显示
+    """
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    secs = int(seconds % 60)
+
+    if hours > 0:
+        return f"{hours}h {minutes}m"
+    elif minutes > 0:
+        return f"{minutes}m {secs}s"
+    else:
+        return f"{secs}s"
@@ -1,15 +1,20 @@
 # from PyQt5.QtWidgets import QStyle
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                               QHBoxLayout, QLabel, QScrollArea, QFrame, QPushButton,
-                              QGraphicsDropShadowEffect, QSystemTrayIcon, QMenu, QMessageBox)
-from PySide6.QtCore import Qt, QTimer, QRectF
+                              QGraphicsDropShadowEffect, QSystemTrayIcon, QMenu, QMessageBox,
+                              QListView, QLineEdit, QStyledItemDelegate, QAbstractItemView)
+from PySide6.QtCore import (Qt, QEvent, QRectF, QSize, QAbstractListModel, QModelIndex,
+                            QSortFilterProxyModel, QObject, Signal)
 from PySide6.QtGui import (QFont, QColor, QPainter, QPen, QBrush, QPixmap,
                            QPainterPath, QIcon)
 
 import sys
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from statictis import AppUsageMonitor
+import threading
+from datetime import date
+from formatting import format_time
+from ipc import IPCError, UsageClient, spawn_collector
+from period_cache import PeriodCache, contains, period_bounds, period_of, shift_period
+from rules import RuleEngine
 import os
 import winreg
 import sys
@@ -26,87 +31,150 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 
-class RoundedBarChartWidget(QWidget):
-    """圆角条形图控件，用于显示应用使用时间排行"""
+class UsageListModel(QAbstractListModel):
+    """应用使用时间列表模型，数据变化时只通知发生变化的行"""
 
-    def __init__(self, data, parent=None):
-        """
-        初始化圆角条形图
+    UsageRole = Qt.UserRole + 1  # 使用时长（秒）
+    RatioRole = Qt.UserRole + 2  # 相对最大值的比例，用于绘制进度条
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._names = []
+        self._values = []
+        self._rows = {}  # 应用名 -> 行号
+        self.max_value = 1
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._names)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role == Qt.DisplayRole:
+            return self._names[row]
+        if role == self.UsageRole:
+            return self._values[row]
+        if role == self.RatioRole:
+            return self._values[row] / self.max_value
+        return None
+
+    def update_data(self, data):
+        """
+        增量更新模型数据
         :param data: 应用使用数据字典 {应用名: 使用时间}
-        :param parent: 父组件
         """
-        super().__init__(parent)
-        self.data = data
-        self.max_value = max(data.values()) if data else 1
-        self.setFixedHeight(len(data) * 40 + 20)  # 动态设置高度
+        # 有应用消失（例如跨天）时整体重置，否则只更新变化的行并追加新行
+        if any(name not in data for name in self._names):
+            self.beginResetModel()
+            self._names = list(data.keys())
+            self._values = list(data.values())
+            self._rows = {name: row for row, name in enumerate(self._names)}
+            self.max_value = max(data.values(), default=0) or 1
+            self.endResetModel()
+            return
 
-    def paintEvent(self, event):
-        """
-        绘制圆角条形图
-        """
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
+        max_value = max(data.values(), default=0) or 1
+        max_changed = max_value != self.max_value
+        self.max_value = max_value
+
+        changed = []
+        new_items = []
+        for name, value in data.items():
+            row = self._rows.get(name)
+            if row is None:
+                new_items.append((name, value))
+            elif self._values[row] != value:
+                self._values[row] = value
+                changed.append(row)
+
+        roles = [self.UsageRole, self.RatioRole]
+        if max_changed and self._names:
+            # 最大值变化时所有进度条比例都变了，视图只会重绘可见的行
+            self.dataChanged.emit(self.index(0), self.index(len(self._names) - 1), roles)
+        else:
+            for row in changed:
+                self.dataChanged.emit(self.index(row), self.index(row), roles)
+
+        if new_items:
+            first = len(self._names)
+            self.beginInsertRows(QModelIndex(), first, first + len(new_items) - 1)
+            for name, value in new_items:
+                self._rows[name] = len(self._names)
+                self._names.append(name)
+                self._values.append(value)
+            self.endInsertRows()
 
-        # 获取排序后的数据（降序）
-        sorted_data = sorted(self.data.items(), key=lambda x: x[1], reverse=True)[:10]
 
-        bar_height = 20
-        spacing = 20
-        left_margin = 120
-        right_margin = 20
-        top_margin = 10
+class RoundedBarDelegate(QStyledItemDelegate):
+    """圆角条形图委托，每次只绘制视图中可见的行"""
 
-        available_width = self.width() - left_margin - right_margin
+    row_height = 40
+    bar_height = 20
+    left_margin = 120
+    right_margin = 20
 
-        font = QFont("Arial", 9)
-        painter.setFont(font)
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.font = QFont("Arial", 9)
+
+    def sizeHint(self, option, index):
+        return QSize(0, self.row_height)
+
+    def paint(self, painter, option, index):
+        """
+        绘制一行圆角条形图
+        """
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setFont(self.font)
         painter.setPen(QColor("#333333"))
 
-        for i, (app_name, value) in enumerate(sorted_data):
-            y_pos = top_margin + i * (bar_height + spacing)
-
-            # 绘制应用名称
-            metrics = painter.fontMetrics()
-            elided_name = metrics.elidedText(app_name, Qt.ElideRight, left_margin - 10)
-            painter.drawText(10, y_pos + bar_height // 2 + 5, elided_name)
-
-            # 绘制背景条
-            bg_path = QPainterPath()
-            bg_rect = QRectF(left_margin, y_pos, available_width, bar_height)
-            bg_path.addRoundedRect(bg_rect, bar_height // 2, bar_height // 2)
-            painter.fillPath(bg_path, QColor("#F0F0F0"))
-
-            # 绘制进度条
-            progress_width = (value / self.max_value) * available_width
-            if progress_width > 0:
-                progress_path = QPainterPath()
-                progress_rect = QRectF(left_margin, y_pos, progress_width, bar_height)
-                progress_path.addRoundedRect(progress_rect, bar_height // 2, bar_height // 2)
-
-                # 使用渐变色
-                gradient = QBrush(QColor("#0A84FF"))  # 苹果蓝
-                painter.fillPath(progress_path, gradient)
-
-            # 绘制数值
-            time_text = self.format_time(value)
-            text_width = metrics.horizontalAdvance(time_text)
-            painter.drawText(left_margin + available_width - text_width - 5,
-                             y_pos + bar_height // 2 + 5, time_text)
-
-    def format_time(self, seconds):
-        """
-        格式化时间显示
-        """
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-
-        if hours > 0:
-            return f"{hours}h {minutes}m"
-        elif minutes > 0:
-            return f"{minutes}m {secs}s"
-        else:
-            return f"{secs}s"
+        rect = option.rect
+        bar_height = self.bar_height
+        y_pos = rect.top() + (rect.height() - bar_height) // 2
+        left = rect.left() + self.left_margin
+        available_width = rect.width() - self.left_margin - self.right_margin
+
+        app_name = index.data(Qt.DisplayRole)
+        value = index.data(UsageListModel.UsageRole)
+        ratio = index.data(UsageListModel.RatioRole)
+
+        # 绘制应用名称
+        metrics = painter.fontMetrics()
+        elided_name = metrics.elidedText(app_name, Qt.ElideRight, self.left_margin - 10)
+        painter.drawText(rect.left() + 10, y_pos + bar_height // 2 + 5, elided_name)
+
+        # 绘制背景条
+        bg_path = QPainterPath()
+        bg_rect = QRectF(left, y_pos, available_width, bar_height)
+        bg_path.addRoundedRect(bg_rect, bar_height // 2, bar_height // 2)
+        painter.fillPath(bg_path, QColor("#F0F0F0"))
+
+        # 绘制进度条
+        progress_width = ratio * available_width
+        if progress_width > 0:
+            progress_path = QPainterPath()
+            progress_rect = QRectF(left, y_pos, progress_width, bar_height)
+            progress_path.addRoundedRect(progress_rect, bar_height // 2, bar_height // 2)
+            painter.fillPath(progress_path, QBrush(QColor("#0A84FF")))  # 苹果蓝
+
+        # 绘制数值
+        time_text = format_time(value)
+        text_width = metrics.horizontalAdvance(time_text)
+        painter.drawText(left + available_width - text_width - 5,
+                         y_pos + bar_height // 2 + 5, time_text)
+
+        painter.restore()
+
+
+class BackgroundNotifier(QObject):
+    """把后台线程中的通知转发到界面线程"""
+    loaded = Signal(object, object)  # 缓存加载完成 (时段, 数据)
+    data_changed = Signal(object)  # 采集进程写入了新数据 (事件)
+    load_failed = Signal(object, object)  # 加载失败 (时段, 异常)
+    collector_started = Signal(bool)  # 拉起采集进程的尝试结束 (是否可用)
+    rules_loaded = Signal(object)  # 采集进程使用的规则 {"rules": [...], "category_limits": {...}}
 
 
 class AppleStyleWindow(QMainWindow):
@@ -117,17 +185,36 @@ class AppleStyleWindow(QMainWindow):
         初始化主窗口
         """
         super().__init__()
-        self.monitor = AppUsageMonitor("usage_data.db")
-        self.init_ui()
-        self.monitor.start_monitoring()
+        # 采集在独立的后台进程中进行，界面只是查询客户端，可以随时打开和关闭
+        self.monitor = UsageClient()
+        self.notifier = BackgroundNotifier()
+        self.notifier.load_failed.connect(self.on_load_failed)
+        self.notifier.collector_started.connect(self.on_collector_started)
+        self.notifier.rules_loaded.connect(self.on_rules_loaded)
+        self.collector_error_shown = False
+        # 拉起采集进程最多要等几秒，放到后台线程，结束后再做第一次加载；
+        # 在此之前的加载失败是正常的启动过程，不提示
+        self.collector_starting = True
+        threading.Thread(target=self.start_collector, name="SpawnCollector", daemon=True).start()
+
+        # 历史数据缓存：使用单独的连接在后台加载，并预取相邻的天/周
+        # 界面线程从不直接查询采集进程，所有数据都经过缓存在后台加载
+        self.notifier.loaded.connect(self.on_period_loaded)
+        self.period_cache = PeriodCache(UsageClient().get_usage_between,
+                                        on_loaded=self.notifier.loaded.emit,
+                                        on_error=self.notifier.load_failed.emit)
+        self.current_period = period_of("day", date.today())
+        self.pending_chart = None  # 等待数据加载完成后显示的图表时段
+
+        # 显示名称使用采集进程的规则，连上采集进程之前先用默认规则
+        self.rules = RuleEngine()
 
-        # 设置定时器定期刷新数据
-        self.refresh_timer = QTimer()
-        self.refresh_timer.timeout.connect(self.refresh_data)
-        self.refresh_timer.start(60000)  # 每分钟刷新一次
+        self.init_ui()
 
-        # 初始加载数据
-        self.refresh_data()
+        # 不再使用定时器轮询：采集进程写入新数据时才刷新，窗口隐藏或最小化期间只记录待刷新的日期
+        self.stale_dates = set()
+        self.notifier.data_changed.connect(self.on_data_changed)
+        self.subscription = self.monitor.subscribe(self.notifier.data_changed.emit)
 
         # 设置苹果风格外观
         self.setup_apple_style()
@@ -135,6 +222,51 @@ class AppleStyleWindow(QMainWindow):
         # 添加系统托盘图标
         self.setup_system_tray()
 
+    def start_collector(self):
+        """确保采集进程在运行（后台线程中调用）"""
+        client = UsageClient(timeout=1.0)
+        ok = spawn_collector(client)
+        if ok:
+            try:
+                self.notifier.rules_loaded.emit(client.request("rules"))
+            except IPCError as e:
+                print(f"Load rules error: {e}")
+        client.close()
+        self.notifier.collector_started.emit(ok)
+
+    def on_rules_loaded(self, config):
+        """收到采集进程的规则（界面线程中调用），按新的显示名称重新渲染当前时段"""
+        try:
+            self.rules = RuleEngine(config.get("rules"), config.get("category_limits"))
+        except (ValueError, AttributeError) as e:
+            print(f"Load rules error: {e}")
+            return
+        data = self.period_cache.get(self.current_period)
+        if data is not None:
+            self.render_usage(self.current_period, data)
+
+    def on_collector_started(self, ok):
+        """拉起采集进程的尝试结束（界面线程中调用）：可用时做第一次加载，否则提示"""
+        self.collector_starting = False
+        if ok:
+            self.refresh_data()
+        else:
+            self.on_load_failed(None, IPCError("Collector unavailable: collector did not start"))
+
+    def on_load_failed(self, period, error):
+        """采集进程不可用（界面线程中调用），恢复连接前只提示一次"""
+        if period is not None and period == self.pending_chart:
+            self.pending_chart = None
+        if self.collector_starting or self.collector_error_shown:
+            return
+        self.collector_error_shown = True
+        self.tray_icon.showMessage(
+            "Screen Time",
+            str(error),
+            QSystemTrayIcon.Warning,
+            5000
+        )
+
     def setup_system_tray(self):
         """设置系统托盘图标"""
         # 创建系统托盘图标
@@ -380,12 +512,46 @@ class AppleStyleWindow(QMainWindow):
         title_label.setStyleSheet("color: #333333;")
         title_layout.addWidget(title_label)
 
+        # 时段切换栏：上一个 / 总使用时间 / 下一个 / 天周切换
+        nav_bar = QWidget()
+        nav_layout = QHBoxLayout(nav_bar)
+        nav_layout.setContentsMargins(0, 5, 0, 0)
+        nav_button_style = """
+            QPushButton {
+                background-color: transparent;
+                border: none;
+                color: #007AFF;
+                font-size: 16px;
+                padding: 0px 6px;
+            }
+            QPushButton:disabled {
+                color: #CCCCCC;
+            }
+        """
+
+        self.prev_button = QPushButton("‹")
+        self.prev_button.setStyleSheet(nav_button_style)
+        self.prev_button.clicked.connect(lambda: self.navigate(-1))
+
         # 总使用时间
         self.total_time_label = QLabel("Today: 00:00")
         self.total_time_label.setFont(QFont("Arial", 12))
         self.total_time_label.setAlignment(Qt.AlignCenter)
-        self.total_time_label.setStyleSheet("color: #888888; margin-top: 5px;")
-        title_layout.addWidget(self.total_time_label)
+        self.total_time_label.setStyleSheet("color: #888888;")
+
+        self.next_button = QPushButton("›")
+        self.next_button.setStyleSheet(nav_button_style)
+        self.next_button.clicked.connect(lambda: self.navigate(1))
+
+        self.kind_button = QPushButton("Week")
+        self.kind_button.setStyleSheet(nav_button_style.replace("font-size: 16px", "font-size: 12px"))
+        self.kind_button.clicked.connect(self.toggle_period_kind)
+
+        nav_layout.addWidget(self.prev_button)
+        nav_layout.addWidget(self.total_time_label, 1)
+        nav_layout.addWidget(self.next_button)
+        nav_layout.addWidget(self.kind_button)
+        title_layout.addWidget(nav_bar)
 
         header_layout.addWidget(control_bar)
         header_layout.addWidget(title_area)
@@ -394,14 +560,50 @@ class AppleStyleWindow(QMainWindow):
 
     def create_content_area(self, parent_layout):
         """
-        创建内容滚动区域
-        """
-        # 创建滚动区域
-        scroll_area = QScrollArea()
-        scroll_area.setWidgetResizable(True)
-        scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        scroll_area.setStyleSheet("""
-            QScrollArea {
+        创建内容区域：搜索框 + 只绘制可见行的应用列表
+        """
+        content = QWidget()
+        content.setStyleSheet("background-color: transparent;")
+        content_layout = QVBoxLayout(content)
+        content_layout.setSpacing(0)
+        content_layout.setContentsMargins(0, 10, 0, 20)
+
+        # 搜索框，过滤在代理模型中完成
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("Filter apps")
+        self.filter_edit.setClearButtonEnabled(True)
+        self.filter_edit.setStyleSheet("""
+            QLineEdit {
+                background-color: #F0F0F0;
+                border: none;
+                border-radius: 8px;
+                padding: 6px 10px;
+                margin: 0px 20px 10px 20px;
+                font-size: 13px;
+            }
+        """)
+        content_layout.addWidget(self.filter_edit)
+
+        # 数据模型：源模型负责增量更新，代理模型负责按时长排序和按名称过滤
+        self.usage_model = UsageListModel(self)
+        self.usage_proxy = QSortFilterProxyModel(self)
+        self.usage_proxy.setSourceModel(self.usage_model)
+        self.usage_proxy.setSortRole(UsageListModel.UsageRole)
+        self.usage_proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+        self.usage_proxy.setDynamicSortFilter(True)
+        self.usage_proxy.sort(0, Qt.DescendingOrder)
+        self.filter_edit.textChanged.connect(self.usage_proxy.setFilterFixedString)
+
+        self.usage_view = QListView()
+        self.usage_view.setModel(self.usage_proxy)
+        self.usage_view.setItemDelegate(RoundedBarDelegate(self.usage_view))
+        self.usage_view.setUniformItemSizes(True)  # 行高固定，滚动时无需逐行计算尺寸
+        self.usage_view.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.usage_view.setSelectionMode(QAbstractItemView.NoSelection)
+        self.usage_view.setFocusPolicy(Qt.NoFocus)
+        self.usage_view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.usage_view.setStyleSheet("""
+            QListView {
                 border: none;
                 background-color: transparent;
             }
@@ -420,16 +622,20 @@ class AppleStyleWindow(QMainWindow):
                 background: rgba(0, 0, 0, 0.3);
             }
         """)
+        content_layout.addWidget(self.usage_view)
+
+        # 没有数据时显示的提示
+        self.no_data_label = QLabel("No app usage data available")
+        self.no_data_label.setAlignment(Qt.AlignCenter)
+        self.no_data_label.setStyleSheet("""
+            color: #888888; 
+            padding: 50px;
+            font-size: 14px;
+        """)
+        self.no_data_label.hide()
+        content_layout.addWidget(self.no_data_label)
 
-        # 内容容器
-        self.content_widget = QWidget()
-        self.content_widget.setStyleSheet("background-color: transparent;")
-        self.content_layout = QVBoxLayout(self.content_widget)
-        self.content_layout.setSpacing(0)
-        self.content_layout.setContentsMargins(0, 0, 0, 20)
-
-        scroll_area.setWidget(self.content_widget)
-        parent_layout.addWidget(scroll_area)
+        parent_layout.addWidget(content)
 
     def create_footer(self, parent_layout):
         """
@@ -505,34 +711,132 @@ class AppleStyleWindow(QMainWindow):
             2000
         )
 
-    def refresh_data(self):
+    def refresh_data(self, dates=None):
+        """
+        刷新应用使用数据：只让包含变化日期的时段失效，其他时段继续使用缓存
+        :param dates: 数据有变化的日期 (YYYY-MM-DD)，默认今天
+        """
+        days = {date.fromisoformat(d) for d in dates} if dates else {date.today()}
+        for day in days:
+            for kind in ("day", "week"):
+                self.period_cache.invalidate(period_of(kind, day))
+        self.show_period(self.current_period)
+
+    def is_shown(self):
+        """窗口是否真的可见：最小化时 isVisible() 仍为 True，但不需要刷新"""
+        return self.isVisible() and not self.isMinimized()
+
+    def on_data_changed(self, event):
+        """采集进程推送的事件：写入了新数据、超过使用上限或插件被隔离（界面线程中调用）"""
+        if event.get("type") == "limit_exceeded":
+            self.tray_icon.showMessage(
+                "Screen Time",
+                f"{event['name']} has reached its daily limit ({format_time(event['limit'])})",
+                QSystemTrayIcon.Warning,
+                5000
+            )
+            return
+        if event.get("type") == "plugin_quarantined":
+            self.tray_icon.showMessage(
+                "Screen Time",
+                f"Plugin {event['name']} was disabled after {event['overruns']} slow calls in a row",
+                QSystemTrayIcon.Warning,
+                5000
+            )
+            return
+        if event.get("type") not in ("data_changed", "connected"):
+            return
+        # 重新连上采集进程时不知道具体哪天有变化，只刷新今天
+        dates = event.get("dates") or [date.today().isoformat()]
+        if self.is_shown():
+            self.refresh_data(dates)
+        else:
+            # 隐藏在托盘或最小化时不做任何查询和渲染，显示时再统一刷新一次
+            self.stale_dates.update(dates)
+
+    def catch_up(self):
+        """补上隐藏期间错过的刷新"""
+        if self.stale_dates and self.is_shown():
+            dates, self.stale_dates = self.stale_dates, set()
+            self.refresh_data(dates)
+
+    def showEvent(self, event):
+        """
+        窗口显示时补上隐藏期间错过的刷新
+        """
+        super().showEvent(event)
+        self.catch_up()
+
+    def changeEvent(self, event):
         """
-        刷新应用使用数据
+        从最小化恢复时补上错过的刷新
         """
-        # 清除现有内容 (保持不变)
-        for i in reversed(range(self.content_layout.count())):
-            widget = self.content_layout.itemAt(i).widget()
-            if widget:
-                widget.setParent(None)
+        super().changeEvent(event)
+        if event.type() == QEvent.WindowStateChange:
+            self.catch_up()
 
-        # 获取今天的数据
-        raw_usage_data = self.monitor.get_today_usage()
+    def navigate(self, steps):
+        """切换到前 / 后若干个时段"""
+        self.show_period(shift_period(self.current_period, steps))
 
+    def toggle_period_kind(self):
+        """在按天和按周浏览之间切换，保持当前所在的日期"""
+        kind, start = self.current_period
+        if kind == "day":
+            self.show_period(period_of("week", start))
+        else:
+            # 从周切回天时，本周定位到今天，历史周定位到周日
+            today = date.today()
+            last_day = shift_period(("day", start), 6)
+            self.show_period(("day", today) if contains(self.current_period, today) else last_day)
+
+    def show_period(self, period):
+        """
+        显示某个时段的数据：命中缓存时立即渲染，否则等待后台加载完成
+        """
+        self.current_period = period
+        kind, _ = period
+        is_current = contains(period, date.today())
+        self.next_button.setEnabled(not is_current)
+        self.kind_button.setText("Week" if kind == "day" else "Day")
+
+        data = self.period_cache.request(period)
+        if data is not None:
+            self.render_usage(period, data)
+
+        # 预取相邻时段，来回切换时无需等待查询
+        neighbours = [shift_period(period, -1)]
+        if not is_current:
+            neighbours.append(shift_period(period, 1))
+        self.period_cache.prefetch(neighbours)
+
+    def on_period_loaded(self, period, data):
+        """后台加载完成（界面线程中调用）"""
+        self.collector_error_shown = False
+        if period == self.current_period:
+            self.render_usage(period, data)
+        if period == self.pending_chart:
+            self.pending_chart = None
+            self.open_chart(period, data)
+
+    def period_title(self, period):
+        kind, start = period
+        today = date.today()
+        if kind == "day":
+            return "Today" if start == today else start.isoformat()
+        if contains(period, today):
+            return "This week"
+        first_day, last_day = period_bounds(period)
+        return f"{first_day} ~ {last_day[5:]}"
+
+    def render_usage(self, period, raw_usage_data):
+        """
+        渲染某个时段的应用使用数据
+        """
         usage_data = {}
         for app_name, duration in raw_usage_data.items():
-            clean_name = app_name.replace(".exe", "").replace(".EXE", "")
-            clean_name = clean_name.capitalize()
-
-            # 3. 特殊名称映射 (可选)
-            name_map = {
-                'Winword': 'Word',
-                'Excel': 'Excel',
-                'Powerpnt': 'PowerPoint',
-                'Msedge': 'Edge',
-                'Code': 'VS Code',
-                'Explorer': '桌面/文件'
-            }
-            display_name = name_map.get(clean_name, clean_name)
+            # 显示名称由规则决定，未配置时去掉 .exe 并首字母大写
+            display_name = self.rules.display_name(app_name)
 
             # 合并时间 (防止 Word.exe 和 WINWORD.EXE 分开计算)
             if display_name in usage_data:
@@ -547,85 +851,52 @@ class AppleStyleWindow(QMainWindow):
         # 更新总时间标签
         hours = int(total_seconds // 3600)
         minutes = int((total_seconds % 3600) // 60)
-        self.total_time_label.setText(f"Today: {hours}h {minutes}m")
-
-        # 如果没有数据，显示提示信息
-        if not usage_data:
-            # ... (保持不变)
-            no_data_label = QLabel("No app usage data available")
-            no_data_label.setAlignment(Qt.AlignCenter)
-            no_data_label.setStyleSheet("""
-                color: #888888; 
-                padding: 50px;
-                font-size: 14px;
-            """)
-            self.content_layout.addWidget(no_data_label)
-            return
+        self.total_time_label.setText(f"{self.period_title(period)}: {hours}h {minutes}m")
 
-        # 创建圆角条形图 (传入清洗后的数据)
-        chart_widget = RoundedBarChartWidget(usage_data)
-        self.content_layout.addWidget(chart_widget)
+        # 没有数据时显示提示信息
+        self.no_data_label.setVisible(not usage_data)
+        self.usage_view.setVisible(bool(usage_data))
+
+        # 增量更新列表模型 (传入清洗后的数据)
+        self.usage_model.update_data(usage_data)
 
     def show_chart(self):
         """
-        显示详细使用情况图表
+        显示当前所在周的详细使用情况图表，数据未缓存时加载完成后再显示
         """
-        # 设置中文字体支持
-        plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'Arial Unicode MS']
-        plt.rcParams['axes.unicode_minus'] = False
-
-        # 获取本周数据
-        weekly_data = self.monitor.get_weekly_usage()
+        period = period_of("week", self.current_period[1])
+        data = self.period_cache.request(period)
+        if data is None:
+            self.pending_chart = period
+            return
+        self.open_chart(period, data)
 
+    def open_chart(self, period, weekly_data):
+        """
+        在新窗口中绘制图表
+        """
         if not weekly_data:
             return
 
-        # 按使用时间排序并取前10个应用
-        top_apps = dict(sorted(weekly_data.items(), key=lambda x: x[1], reverse=True)[:10])
-
-        # 创建图表窗口
-        fig, ax = plt.subplots(figsize=(10, 6))
-        fig.patch.set_facecolor('#F5F5F7')  # 苹果浅灰背景
-
-        # 准备数据
-        apps = list(top_apps.keys())
-        # 修改数据处理行:
-        times = [t / 60 for t in top_apps.values()]
-
-        # 创建水平条形图
-        bars = ax.barh(range(len(apps)), times, color='#007AFF', height=0.7)
+        # matplotlib 只在打开图表时才导入，不拖慢界面启动；不使用 pyplot，关闭窗口后图表即可释放
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.figure import Figure
+        from charts import FIGURE_SIZE, draw_usage_chart, setup_fonts
 
-        # 设置Y轴标签
-        ax.set_yticks(range(len(apps)))
-        ax.set_yticklabels(apps)
-
-        # 设置图表样式
-        # 保持x轴标签为小时:
-        ax.set_xlabel('Minutes', fontsize=12, color='#333333')
-        ax.set_title('Weekly App Usage', fontsize=16, pad=20, color='#333333')
-        ax.grid(axis='x', alpha=0.3, color='#CCCCCC')
-        ax.set_facecolor('#FFFFFF')
-
-        # 设置坐标轴颜色
-        ax.spines['top'].set_visible(False)
-        ax.spines['right'].set_visible(False)
-        ax.spines['bottom'].set_color('#CCCCCC')
-        ax.spines['left'].set_color('#CCCCCC')
-        ax.tick_params(colors='#333333')
-
-        # 在条形图上显示数值
-        for i, (bar, time_val) in enumerate(zip(bars, times)):
-            ax.text(bar.get_width() + 0.1, bar.get_y() + bar.get_height() / 2,
-                    f'{time_val:.1f}m', va='center', fontsize=10, color='#333333')
+        # 设置中文字体支持
+        setup_fonts()
 
-        # 反转Y轴使最长的应用在最上面
-        ax.invert_yaxis()
+        # 创建图表，样式与批量报告共用
+        fig = Figure(figsize=FIGURE_SIZE)
+        ax = fig.add_subplot()
+        draw_usage_chart(fig, ax, weekly_data, f'Weekly App Usage ({self.period_title(period)})')
 
         # 调整布局
-        plt.tight_layout()
+        fig.tight_layout()
 
         # 创建新的Qt窗口显示图表
         chart_window = QMainWindow(self)
+        chart_window.setAttribute(Qt.WA_DeleteOnClose)
         chart_window.setWindowTitle("Detailed Usage Chart")
         chart_window.setGeometry(150, 150, 900, 600)
         # 设置图标
@@ -649,7 +920,10 @@ class AppleStyleWindow(QMainWindow):
         """
         窗口关闭事件处理
         """
-        self.monitor.stop_monitoring()
+        # 只断开与采集进程的连接，采集继续在后台进行
+        self.subscription.close()
+        self.period_cache.shutdown()
+        self.monitor.close()
         event.accept()
 
     def mousePressEvent(self, event):
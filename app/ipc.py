@@ -0,0 +1,404 @@
+# ipc.py
+# 采集进程与界面之间的本地通信：基于 127.0.0.1 上的 TCP 连接，每行一个 JSON 消息
+# 端口和访问令牌写在当前用户目录下的端点文件中，每个请求都要带上令牌，其他用户无法读取或修改数据
+# 只依赖标准库，采集进程和界面进程都可以导入
+import asyncio
+import hmac
+import json
+import os
+import secrets
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+HOST = "127.0.0.1"
+PORT = 0  # 由系统分配空闲端口，实际端口写入端点文件
+ENDPOINT_FILE = "collector.json"
+UNAUTHORIZED = "Unauthorized"
+
+
+class IPCError(Exception):
+    """采集进程返回错误或无法连接时抛出"""
+
+
+def runtime_dir() -> str:
+    """
+    当前用户专用的运行时目录：Windows 下为 %LOCALAPPDATA%\\ScreenTime，其他系统为 ~/.screentime
+    """
+    base = os.environ.get("LOCALAPPDATA")
+    path = os.path.join(base, "ScreenTime") if base else os.path.join(os.path.expanduser("~"), ".screentime")
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    return path
+
+
+def write_endpoint(host: str, port: int, token: str):
+    """
+    写入端点文件（仅当前用户可读），先写临时文件再替换，客户端不会读到写了一半的内容
+    """
+    path = os.path.join(runtime_dir(), ENDPOINT_FILE)
+    fd = os.open(path + ".tmp", os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"host": host, "port": port, "token": token, "pid": os.getpid()}, f)
+    os.replace(path + ".tmp", path)
+
+
+def read_endpoint() -> Optional[dict]:
+    """读取端点文件，采集进程没有运行过时返回 None"""
+    try:
+        with open(os.path.join(runtime_dir(), ENDPOINT_FILE), encoding="utf-8") as f:
+            info = json.load(f)
+        return {"host": str(info["host"]), "port": int(info["port"]), "token": str(info["token"])}
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def remove_endpoint(token: str):
+    """采集进程退出时删除自己写入的端点文件"""
+    info = read_endpoint()
+    if info is not None and info["token"] == token:
+        try:
+            os.remove(os.path.join(runtime_dir(), ENDPOINT_FILE))
+        except OSError:
+            pass
+
+
+def resolve_endpoint(host=None, port=None, token=None):
+    """
+    返回 (host, port, token)；没有显式指定端口时读取当前用户的端点文件
+    :raises ConnectionRefusedError: 找不到端点文件，采集进程没有运行
+    """
+    if port is not None:
+        return host or HOST, port, token or ""
+    info = read_endpoint()
+    if info is None:
+        raise ConnectionRefusedError("collector is not running")
+    return info["host"], info["port"], info["token"]
+
+
+class UsageServer:
+    """运行在采集进程事件循环中的查询服务"""
+
+    def __init__(self, monitor, host=HOST, port=PORT, token=None, on_stop=None):
+        """
+        :param monitor: AppUsageMonitor 实例
+        :param token: 访问令牌，默认随机生成
+        :param on_stop: 收到 stop 命令时调用，用于结束采集进程
+        """
+        self.monitor = monitor
+        self.host = host
+        self.port = port
+        self.token = token or secrets.token_hex(16)
+        self.on_stop = on_stop
+        self._sock = None
+        self._connections = set()
+
+    def bind(self) -> int:
+        """
+        同步绑定监听端口，应在启动监控之前调用，这样端口被占用时能直接报错退出
+        :return: 实际监听的端口
+        :raises OSError: 绑定失败
+        """
+        self._sock = socket.create_server((self.host, self.port))
+        self.port = self._sock.getsockname()[1]
+        return self.port
+
+    async def serve(self):
+        """常驻服务，通过 monitor.add_service 注册"""
+        if self._sock is None:
+            self.bind()
+        server = await asyncio.start_server(self._handle, sock=self._sock)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            # 停止时一并取消仍然连着的客户端
+            for task in list(self._connections):
+                task.cancel()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request, error = self._parse(line)
+                if request is not None and request.get("cmd") == "subscribe":
+                    # 订阅后这个连接只用于推送事件
+                    await self._stream_events(writer)
+                    break
+                if request is None:
+                    response = {"ok": False, "error": error}
+                else:
+                    try:
+                        response = {"ok": True, "result": await self._dispatch(request)}
+                    except Exception as e:
+                        response = {"ok": False, "error": str(e)}
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+                if error == UNAUTHORIZED:
+                    # 令牌不正确时不再处理这个连接上的请求
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # 连接任务被取消时正常结束即可，不再向上抛出
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    def _parse(self, line: bytes):
+        """解析并校验一条请求，返回 (请求, 错误信息)"""
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return None, str(e)
+        if not isinstance(request, dict):
+            return None, "Request must be a JSON object"
+        token = str(request.get("token", "")).encode("utf-8")
+        if not hmac.compare_digest(token, self.token.encode("utf-8")):
+            return None, UNAUTHORIZED
+        return request, None
+
+    async def _stream_events(self, writer):
+        """把监控器的事件逐行推送给订阅的客户端，直到连接断开"""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+
+        def listener(event):
+            # 监听器可能在其他线程中被调用（例如退出时的最后一次写入）
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:
+                pass
+
+        self.monitor.add_listener(listener)
+        try:
+            writer.write(json.dumps({"ok": True, "result": "subscribed"}).encode("utf-8") + b"\n")
+            await writer.drain()
+            while True:
+                event = await queue.get()
+                writer.write(json.dumps(event).encode("utf-8") + b"\n")
+                await writer.drain()
+        finally:
+            self.monitor.remove_listener(listener)
+
+    async def _dispatch(self, request):
+        cmd = request.get("cmd")
+        loop = asyncio.get_running_loop()
+
+        if cmd == "ping":
+            return "pong"
+        if cmd == "snapshot":
+            # 数据库查询放到线程池，避免阻塞采样
+            return await loop.run_in_executor(None, self.monitor.get_today_usage)
+        if cmd == "range":
+            return await loop.run_in_executor(None, self.monitor.get_usage_between,
+                                              request["start"], request["end"])
+        if cmd == "rules":
+            # 界面使用与采集进程相同的规则显示名称
+            rules = self.monitor.rules
+            return {"rules": rules.rules, "category_limits": rules.category_limits}
+        if cmd == "plugins":
+            plugins = self.monitor.plugins
+            return plugins.metrics() if plugins is not None else {}
+        if cmd == "plugin_release":
+            plugins = self.monitor.plugins
+            if plugins is None or not plugins.release(str(request.get("name"))):
+                raise ValueError(f"Unknown plugin: {request.get('name')}")
+            return "released"
+        if cmd == "stop":
+            if self.on_stop:
+                loop.call_soon(self.on_stop)
+            return "stopping"
+        raise ValueError(f"Unknown command: {cmd}")
+
+
+def _parse_response(line: bytes) -> dict:
+    """
+    解析一行响应
+    :raises ValueError: 不是 JSON 对象
+    """
+    response = json.loads(line)
+    if not isinstance(response, dict):
+        raise ValueError("response must be a JSON object")
+    return response
+
+
+class UsageClient:
+    """
+    界面使用的轻量客户端，查询接口与 AppUsageMonitor 保持一致
+    """
+
+    def __init__(self, host=None, port=None, token=None, timeout=5.0):
+        """
+        :param port: 默认在每次连接时从端点文件读取地址和令牌，采集进程重启后也能重新连上
+        """
+        self.host = host
+        self.port = port
+        self.token = token
+        self.timeout = timeout
+        self._sock = None
+        self._file = None
+        self._token = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        host, port, self._token = resolve_endpoint(self.host, self.port, self.token)
+        self._sock = socket.create_connection((host, port), timeout=self.timeout)
+        self._file = self._sock.makefile("rb")
+
+    def close(self):
+        """关闭连接，不影响采集进程"""
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self._file:
+            self._file.close()
+        if self._sock:
+            self._sock.close()
+        self._sock = None
+        self._file = None
+
+    def request(self, cmd: str, **params):
+        """
+        发送一条命令并等待结果
+        :raises IPCError: 无法连接采集进程或命令执行失败
+        """
+        with self._lock:
+            # 连接可能已被采集进程关闭，失败时重连一次
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    payload = dict(params, cmd=cmd, token=self._token)
+                    self._sock.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+                    line = self._file.readline()
+                    if not line:
+                        raise ConnectionError("connection closed")
+                    break
+                except OSError as e:
+                    self._close()
+                    if attempt:
+                        raise IPCError(f"Collector unavailable: {e}") from e
+
+        try:
+            response = _parse_response(line)
+        except ValueError as e:
+            # 端口上不是采集进程，或者连接状态已经错乱，下次请求重新连接
+            self.close()
+            raise IPCError(f"Invalid response from collector: {e}") from e
+        if not response.get("ok"):
+            raise IPCError(response.get("error"))
+        return response.get("result")
+
+    def subscribe(self, callback) -> "EventSubscription":
+        """
+        订阅采集进程推送的事件，callback(event) 在后台线程中调用
+        """
+        return EventSubscription(callback, self.host, self.port, self.token)
+
+    def ping(self) -> bool:
+        try:
+            return self.request("ping") == "pong"
+        except IPCError:
+            return False
+
+    def get_usage_between(self, start_date: str, end_date: str) -> Dict[str, float]:
+        return self.request("range", start=start_date, end=end_date)
+
+    def get_today_usage(self) -> Dict[str, float]:
+        return self.request("snapshot")
+
+    def get_weekly_usage(self) -> Dict[str, float]:
+        today = datetime.now()
+        first_day = (today - timedelta(days=6)).strftime('%Y-%m-%d')
+        return self.get_usage_between(first_day, today.strftime('%Y-%m-%d'))
+
+
+class EventSubscription:
+    """
+    后台线程中保持一条订阅连接，断线后自动重连；等待事件时不占用 CPU
+    每次订阅成功后先推送一条 {"type": "connected"} 事件，订阅方可以借此补上断线期间错过的数据
+    """
+
+    def __init__(self, callback, host=None, port=None, token=None, retry_interval=5.0):
+        """
+        :param retry_interval: 重连间隔上限，从 0.5 秒开始逐次加倍
+        """
+        self.callback = callback
+        self.host = host
+        self.port = port
+        self.token = token
+        self.retry_interval = retry_interval
+        self._closed = threading.Event()
+        self._sock = None
+        self._thread = threading.Thread(target=self._run, name="EventSubscription", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._closed.set()
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+
+    def _run(self):
+        delay = 0.5
+        while not self._closed.is_set():
+            try:
+                host, port, token = resolve_endpoint(self.host, self.port, self.token)
+                with socket.create_connection((host, port), timeout=5.0) as sock:
+                    sock.settimeout(None)
+                    self._sock = sock
+                    sock.sendall(json.dumps({"cmd": "subscribe", "token": token}).encode("utf-8") + b"\n")
+                    with sock.makefile("rb") as f:
+                        if not _parse_response(f.readline()).get("ok"):
+                            raise ValueError("subscription rejected")
+                        delay = 0.5
+                        self.callback({"type": "connected"})
+                        for line in f:
+                            self.callback(json.loads(line))
+            except (OSError, ValueError):
+                pass
+            finally:
+                self._sock = None
+            self._closed.wait(delay)
+            delay = min(delay * 2, self.retry_interval)
+
+
+def spawn_collector(client: Optional[UsageClient] = None, wait: float = 5.0) -> bool:
+    """
+    确保采集进程在运行，不在运行时以独立进程启动它
+    :return: True 表示采集进程已可用
+    """
+    client = client or UsageClient()
+    if client.ping():
+        return True
+
+    if getattr(sys, "frozen", False):
+        # PyInstaller 打包后由 main.exe --collector 启动采集进程
+        cmd = [sys.executable, "--collector"]
+    else:
+        cmd = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py"), "--collector"]
+
+    # Windows 下脱离当前进程和控制台，关闭界面后采集进程继续运行
+    flags = getattr(subprocess, "DETACHED_PROCESS", 0) | getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0)
+    subprocess.Popen(cmd, creationflags=flags, close_fds=True,
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        if client.ping():
+            return True
+        time.sleep(0.1)
+    return False
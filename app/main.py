@@ -1,5 +1,11 @@
-from gui import main
+import sys
 
 if __name__ == "__main__":
-    # 启动GUI应用程序
-    main()
+    if "--collector" in sys.argv:
+        # 启动无界面的采集进程，不导入任何 GUI 模块
+        sys.argv.remove("--collector")
+        from collector import main
+    else:
+        # 启动GUI应用程序
+        from gui import main
+    sys.exit(main())
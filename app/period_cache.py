@@ -0,0 +1,147 @@
+# period_cache.py
+# 按天 / 按周 / 按月聚合数据的 LRU 缓存，在后台线程中加载并预取相邻时段
+# 只依赖标准库，与界面框架无关
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+Period = Tuple[str, date]  # (类型 "day" / "week" / "month", 起始日期)
+
+
+def period_of(kind: str, day: date) -> Period:
+    """返回包含 day 的时段，周从周一开始"""
+    if kind == "week":
+        return kind, day - timedelta(days=day.weekday())
+    if kind == "month":
+        return kind, day.replace(day=1)
+    return "day", day
+
+
+def period_bounds(period: Period) -> Tuple[str, str]:
+    """返回时段的起止日期字符串 (YYYY-MM-DD, YYYY-MM-DD)，两端都包含"""
+    kind, start = period
+    if kind == "week":
+        end = start + timedelta(days=6)
+    elif kind == "month":
+        end = shift_period(period, 1)[1] - timedelta(days=1)
+    else:
+        end = start
+    return start.isoformat(), end.isoformat()
+
+
+def shift_period(period: Period, steps: int) -> Period:
+    """向前（负数）或向后（正数）移动若干个时段"""
+    kind, start = period
+    if kind == "month":
+        months = start.year * 12 + start.month - 1 + steps
+        return kind, date(months // 12, months % 12 + 1, 1)
+    return kind, start + timedelta(days=(7 if kind == "week" else 1) * steps)
+
+
+def contains(period: Period, day: date) -> bool:
+    start, end = period_bounds(period)
+    return start <= day.isoformat() <= end
+
+
+class PeriodCache:
+    """
+    有容量上限的时段聚合缓存
+    数据在后台线程中加载，加载完成后通过 on_loaded(period, data) 回调通知，
+    加载失败时通过 on_error(period, error) 回调通知（都在后台线程中调用）
+    """
+
+    def __init__(self, fetch: Callable[[str, str], Dict[str, float]], capacity: int = 32,
+                 on_loaded: Optional[Callable[[Period, Dict[str, float]], None]] = None,
+                 on_error: Optional[Callable[[Period, Exception], None]] = None):
+        """
+        :param fetch: 查询函数 fetch(start_date, end_date) -> {应用名: 秒}，会在后台线程中调用
+        :param capacity: 最多缓存的时段数
+        :param on_loaded: 数据加载完成后的回调
+        :param on_error: 数据加载失败后的回调，失败的时段不会被缓存，下次请求时重新加载
+        """
+        self.fetch = fetch
+        self.capacity = capacity
+        self.on_loaded = on_loaded
+        self.on_error = on_error
+        self._entries: "OrderedDict[Period, Dict[str, float]]" = OrderedDict()
+        self._inflight = set()
+        self._generation: Dict[Period, int] = {}
+        self._lock = threading.Lock()
+        # concurrent.futures 会连带导入 logging，放在这里导入，命令行只用时段函数时不必加载
+        from concurrent.futures import ThreadPoolExecutor
+
+        # 单个工作线程，按提交顺序加载：当前时段先于预取的相邻时段
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="PeriodCache")
+
+    def get(self, period: Period) -> Optional[Dict[str, float]]:
+        """只查缓存，不触发加载"""
+        with self._lock:
+            data = self._entries.get(period)
+            if data is not None:
+                self._entries.move_to_end(period)
+            return data
+
+    def request(self, period: Period) -> Optional[Dict[str, float]]:
+        """
+        命中缓存时直接返回数据，否则在后台加载并返回 None
+        """
+        data = self.get(period)
+        if data is None:
+            self._submit(period)
+        return data
+
+    def prefetch(self, periods: Iterable[Period]):
+        """在后台预先加载尚未缓存的时段"""
+        for period in periods:
+            if self.get(period) is None:
+                self._submit(period)
+
+    def invalidate(self, period: Period):
+        """丢弃某个时段的缓存，正在加载的旧结果也不会再写入"""
+        with self._lock:
+            self._entries.pop(period, None)
+            self._generation[period] = self._generation.get(period, 0) + 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, period: Period):
+        with self._lock:
+            if period in self._inflight:
+                return
+            self._inflight.add(period)
+            generation = self._generation.get(period, 0)
+        try:
+            self._executor.submit(self._load, period, generation)
+        except RuntimeError:
+            # 已经 shutdown
+            with self._lock:
+                self._inflight.discard(period)
+
+    def _load(self, period: Period, generation: int):
+        try:
+            data = self.fetch(*period_bounds(period))
+        except Exception as e:
+            print(f"Load period error: {e}")
+            with self._lock:
+                self._inflight.discard(period)
+            if self.on_error:
+                self.on_error(period, e)
+            return
+
+        with self._lock:
+            self._inflight.discard(period)
+            stale = generation != self._generation.get(period, 0)
+            if not stale:
+                self._entries[period] = data
+                self._entries.move_to_end(period)
+                while len(self._entries) > self.capacity:
+                    self._entries.popitem(last=False)
+
+        if stale:
+            # 加载期间数据已失效，重新加载最新数据
+            self._submit(period)
+            return
+        if self.on_loaded:
+            self.on_loaded(period, data)
@@ -0,0 +1,310 @@
+# plugins.py
+# 插件钩子：焦点切换、写入数据库、跨天时通知插件
+# 插件在有上限的后台线程池中执行，每个插件有自己的有界队列和耗时预算，统计逻辑从不等待插件
+# 看门狗线程检查仍在执行的调用，卡住的插件由替补线程顶上，连续多次超出预算的插件被隔离
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, Optional
+
+EVENTS = ("focus_change", "flush", "day_rollover")
+POLICIES = ("drop_oldest", "drop_newest", "coalesce")
+
+# 每次调度最多连续处理的事件数，处理完后让出线程，避免一个插件长期占用
+DRAIN_BATCH = 16
+# 有调用在执行时看门狗的检查间隔（秒），没有调用时看门狗不运行
+WATCHDOG_INTERVAL = 0.05
+
+
+class _PluginSlot:
+    """单个插件的队列、状态和统计"""
+
+    def __init__(self, name, handler, events, budget_ms, hang_ms, queue_size, policy, max_overruns):
+        self.name = name
+        self.handler = handler
+        self.events = frozenset(events)
+        self.budget = budget_ms / 1000.0
+        self.hang = hang_ms / 1000.0
+        self.queue_size = queue_size
+        self.policy = policy
+        self.max_overruns = max_overruns
+        self.pending = deque()
+        self.scheduled = False  # 已在等待或正在被工作线程处理
+        self.call_started = None  # 正在执行的调用的开始时间
+        self.call_overrun = False  # 正在执行的调用已被看门狗计为超出预算
+        self.call_stalled = False  # 正在执行的调用已被看门狗判定为卡住，并补充了工作线程
+        self.consecutive_overruns = 0  # 连续超出预算的次数，按时完成一次即清零
+        self.quarantined = False
+        self.lock = threading.Lock()
+        self.metrics = {
+            "calls": 0,
+            "errors": 0,
+            "overruns": 0,  # 超过耗时预算的次数，包括仍在执行中就已超时的调用
+            "stalled": 0,  # 执行超过 hang_ms 被判定为卡住的次数
+            "dropped": 0,
+            "coalesced": 0,
+            "quarantine_dropped": 0,  # 隔离后丢弃的事件数
+            "max_ms": 0.0,
+            "total_ms": 0.0,
+        }
+
+
+class PluginManager:
+    """
+    插件管理器：
+        manager = PluginManager()
+        manager.register(handler, events=["focus_change"], budget_ms=20)
+    handler(event, payload) 在后台线程中调用；emit 只做入队，永远不会阻塞调用方
+    """
+
+    def __init__(self, max_workers: int = 2, on_quarantine: Optional[Callable[[str, int], None]] = None):
+        """
+        :param max_workers: 执行插件的线程数上限
+        :param on_quarantine: 插件被隔离时调用 on_quarantine(插件名, 连续超时次数)，在插件线程中执行
+        """
+        self.on_quarantine = on_quarantine
+        self._slots = []
+        self._by_event: Dict[str, list] = {event: [] for event in EVENTS}
+        self._ready = queue.Queue()
+        self._idle = threading.Condition()
+        self._closed = False
+        self._active = 0  # 正在执行的调用数
+        self._watch = threading.Condition()
+        self._worker_ids = itertools.count()
+        self._workers = []
+        for _ in range(max_workers):
+            self._start_worker()
+        threading.Thread(target=self._watchdog, name="Plugin-watchdog", daemon=True).start()
+
+    def register(self, handler: Callable[[str, dict], None], events: Iterable[str] = EVENTS,
+                 name: Optional[str] = None, budget_ms: float = 50.0, queue_size: int = 64,
+                 policy: str = "drop_oldest", max_overruns: Optional[int] = 5, hang_ms: float = 1000.0):
+        """
+        注册插件
+        :param handler: 回调 handler(event, payload)
+        :param events: 订阅的事件，取值见 EVENTS
+        :param budget_ms: 单次执行的耗时预算，超出时计入 overruns
+        :param queue_size: 等待处理的事件上限
+        :param policy: 队列满时的策略：drop_oldest 丢弃最旧的事件，drop_newest 丢弃新事件，
+                       coalesce 同类事件只保留最新的一条
+        :param max_overruns: 连续这么多次超出预算后隔离插件，丢弃它的全部事件，可用 release 解除；
+                             None 表示从不隔离
+        :param hang_ms: 单次执行超过这个时间视为卡住，看门狗补充一个工作线程，不让其他插件等待
+        :raises ValueError: 事件或策略不存在
+        """
+        events = list(events)
+        unknown = [event for event in events if event not in EVENTS]
+        if unknown:
+            raise ValueError(f"Unknown plugin events: {', '.join(unknown)}")
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown queue policy: {policy}")
+
+        slot = _PluginSlot(name or getattr(handler, "__name__", repr(handler)),
+                           handler, events, budget_ms, max(hang_ms, budget_ms), max(queue_size, 1), policy,
+                           max_overruns)
+        self._slots.append(slot)
+        for event in events:
+            self._by_event[event].append(slot)
+        return slot.name
+
+    def emit(self, event: str, payload: dict):
+        """
+        通知订阅了 event 的插件，只入队不等待
+        """
+        if self._closed:
+            return
+        for slot in self._by_event.get(event, ()):
+            with slot.lock:
+                if slot.quarantined:
+                    slot.metrics["quarantine_dropped"] += 1
+                    continue
+                self._enqueue(slot, event, payload)
+                if slot.scheduled or not slot.pending:
+                    continue
+                slot.scheduled = True
+            self._ready.put(slot)
+
+    def _enqueue(self, slot: _PluginSlot, event: str, payload: dict):
+        if slot.policy == "coalesce":
+            for i, (queued_event, _) in enumerate(slot.pending):
+                if queued_event == event:
+                    slot.pending[i] = (event, payload)
+                    slot.metrics["coalesced"] += 1
+                    return
+        if len(slot.pending) >= slot.queue_size:
+            slot.metrics["dropped"] += 1
+            if slot.policy == "drop_newest":
+                return
+            slot.pending.popleft()
+        slot.pending.append((event, payload))
+
+    def _start_worker(self):
+        worker = threading.Thread(target=self._worker, name=f"Plugin-{next(self._worker_ids)}", daemon=True)
+        self._workers.append(worker)
+        worker.start()
+
+    def _worker(self):
+        while True:
+            slot = self._ready.get()
+            if slot is None:
+                return
+            if self._drain(slot):
+                # 看门狗已经为卡住的调用补充了一个线程，当前线程退出，线程数保持不变
+                self._workers.remove(threading.current_thread())
+                return
+
+    def _drain(self, slot: _PluginSlot) -> bool:
+        """
+        连续处理一个插件的事件
+        :return: True 表示有调用被看门狗判定为卡住
+        """
+        stalled = False
+        for _ in range(DRAIN_BATCH):
+            with slot.lock:
+                if not slot.pending:
+                    break
+                event, payload = slot.pending.popleft()
+                start = slot.call_started = time.perf_counter()
+            with self._watch:
+                self._active += 1
+                self._watch.notify()
+
+            try:
+                slot.handler(event, payload)
+            except Exception as e:
+                slot.metrics["errors"] += 1
+                print(f"Plugin {slot.name} error: {e}")
+            elapsed = time.perf_counter() - start
+
+            with self._watch:
+                self._active -= 1
+            quarantined = False
+            with slot.lock:
+                stalled = slot.call_stalled
+                counted = slot.call_overrun
+                slot.call_started = None
+                slot.call_overrun = slot.call_stalled = False
+                metrics = slot.metrics
+                metrics["calls"] += 1
+                metrics["total_ms"] += elapsed * 1000
+                metrics["max_ms"] = max(metrics["max_ms"], elapsed * 1000)
+                if elapsed <= slot.budget:
+                    slot.consecutive_overruns = 0
+                elif not counted:
+                    quarantined = self._overrun(slot, elapsed)
+            if quarantined:
+                self._notify_quarantine(slot)
+            if stalled:
+                break
+
+        with slot.lock:
+            if slot.pending and not self._closed:
+                # 还有积压的事件，排到队尾让其他插件先执行
+                self._ready.put(slot)
+                return stalled
+            slot.scheduled = False
+        with self._idle:
+            self._idle.notify_all()
+        return stalled
+
+    def _overrun(self, slot: _PluginSlot, elapsed: float) -> bool:
+        """
+        记录一次超出预算，连续达到 max_overruns 次时隔离插件；调用方需持有 slot.lock
+        :return: True 表示插件刚被隔离，调用方释放锁后应调用 _notify_quarantine
+        """
+        slot.metrics["overruns"] += 1
+        slot.consecutive_overruns += 1
+        if slot.metrics["overruns"] == 1:
+            print(f"Plugin {slot.name} exceeded its budget: {elapsed * 1000:.1f} ms")
+        if slot.quarantined or not slot.max_overruns or slot.consecutive_overruns < slot.max_overruns:
+            return False
+        slot.quarantined = True
+        slot.metrics["quarantine_dropped"] += len(slot.pending)
+        slot.pending.clear()
+        print(f"Plugin {slot.name} quarantined after {slot.consecutive_overruns} consecutive overruns")
+        return True
+
+    def _notify_quarantine(self, slot: _PluginSlot):
+        if self.on_quarantine is not None:
+            try:
+                self.on_quarantine(slot.name, slot.consecutive_overruns)
+            except Exception as e:
+                print(f"Quarantine callback error: {e}")
+
+    def release(self, name: str) -> bool:
+        """
+        解除插件的隔离并清零连续超时次数，之后的事件照常处理
+        :return: False 表示没有这个插件
+        """
+        found = False
+        for slot in self._slots:
+            if slot.name == name:
+                with slot.lock:
+                    slot.quarantined = False
+                    slot.consecutive_overruns = 0
+                found = True
+        return found
+
+    def _watchdog(self):
+        """
+        有调用在执行时定期检查：执行中就已超出预算的调用立即计为超时；
+        超过 hang_ms 的调用视为卡住，补充一个工作线程，卡住的插件不会占满线程池
+        """
+        while True:
+            with self._watch:
+                while not self._active and not self._closed:
+                    self._watch.wait()
+                if self._closed:
+                    return
+            time.sleep(WATCHDOG_INTERVAL)
+
+            now = time.perf_counter()
+            for slot in list(self._slots):
+                quarantined = replace = False
+                with slot.lock:
+                    started = slot.call_started
+                    if started is None:
+                        continue
+                    running = now - started
+                    if running > slot.budget and not slot.call_overrun:
+                        slot.call_overrun = True
+                        quarantined = self._overrun(slot, running)
+                    if running > slot.hang and not slot.call_stalled:
+                        slot.call_stalled = replace = True
+                        slot.metrics["stalled"] += 1
+                if quarantined:
+                    self._notify_quarantine(slot)
+                if replace:
+                    self._start_worker()
+
+    def metrics(self) -> Dict[str, dict]:
+        """各插件的统计数据，running_ms 为正在执行的调用已经耗费的时间"""
+        now = time.perf_counter()
+        result = {}
+        for slot in self._slots:
+            with slot.lock:
+                running = (now - slot.call_started) * 1000 if slot.call_started is not None else 0.0
+                result[slot.name] = dict(slot.metrics, queued=len(slot.pending), budget_ms=slot.budget * 1000,
+                                         running_ms=running, quarantined=slot.quarantined,
+                                         consecutive_overruns=slot.consecutive_overruns)
+        return result
+
+    def shutdown(self, timeout: float = 1.0):
+        """
+        停止接收新事件，最多等待 timeout 秒让已入队的事件处理完；
+        工作线程是守护线程，卡住的插件不会阻止进程退出
+        """
+        deadline = time.monotonic() + timeout
+        with self._idle:
+            while any(slot.scheduled for slot in self._slots):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._idle.wait(remaining)
+        self._closed = True
+        with self._watch:
+            self._watch.notify_all()
+        for _ in list(self._workers):
+            self._ready.put(None)
@@ -0,0 +1,177 @@
+# reports.py
+# 批量生成周报 / 月报（PNG / SVG / PDF）：在进程池中使用非交互的 Agg 后端渲染，不依赖 Qt，可在无界面环境运行
+# 图表样式与界面中的详细图表共用 charts.draw_usage_chart
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+from cli import connect_readonly, parse_date, query_usage
+from period_cache import period_bounds, period_of, shift_period
+
+STYLE_VERSION = 1  # 修改图表样式后加 1，强制重新生成全部报告
+FORMATS = ("png", "svg", "pdf")
+MANIFEST = "manifest.json"
+
+# 每个工作进程复用的图表模板，由 _init_worker 创建
+_figure = None
+
+
+def _init_worker():
+    """工作进程初始化：选择 Agg 后端并创建可复用的 Figure"""
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from charts import FIGURE_SIZE, setup_fonts
+
+    global _figure
+    setup_fonts()
+    _figure = Figure(figsize=FIGURE_SIZE)
+    FigureCanvasAgg(_figure)
+
+
+def source_name(db_file):
+    """
+    报告来源名称：每个用户 / 机器的数据库放在单独目录时使用目录名，否则使用文件名
+    """
+    stem = os.path.splitext(os.path.basename(db_file))[0]
+    if stem == "usage_data":
+        return os.path.basename(os.path.dirname(os.path.abspath(db_file))) or stem
+    return stem
+
+
+def data_digest(rows):
+    """输入数据的摘要，数据和样式都没变时可以跳过渲染"""
+    payload = json.dumps([STYLE_VERSION, rows], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def render_report(job):
+    """
+    在工作进程中生成一份报告
+    :param job: (数据库路径, 来源名称, 时段, 输出格式, 输出目录, 上次的数据摘要)
+    :return: (报告键, 数据摘要, 状态) 状态为 rendered / skipped / empty / error: ...
+    """
+    db_file, source, period, formats, out_dir, previous_digest = job
+    kind, _ = period
+    start_date, end_date = period_bounds(period)
+    key = f"{source}/{kind}-{start_date}"
+
+    try:
+        conn = connect_readonly(db_file)
+        try:
+            rows = query_usage(conn, start_date, end_date)
+        finally:
+            conn.close()
+
+        digest = data_digest(rows)
+        base = os.path.join(out_dir, source, f"{kind}-{start_date}")
+        paths = [f"{base}.{fmt}" for fmt in formats]
+        if digest == previous_digest and all(os.path.exists(path) for path in paths):
+            return key, digest, "skipped"
+        if not rows:
+            return key, digest, "empty"
+
+        from charts import draw_usage_chart
+
+        title = f"{source} · {'Weekly' if kind == 'week' else 'Monthly'} App Usage ({start_date} ~ {end_date})"
+        _figure.clear()
+        ax = _figure.add_subplot()
+        draw_usage_chart(_figure, ax, dict(rows), title)
+        _figure.tight_layout()
+
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        for path, fmt in zip(paths, formats):
+            _figure.savefig(path, format=fmt)
+        return key, digest, "rendered"
+    except Exception as e:
+        return key, previous_digest, f"error: {e}"
+
+
+def load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(out_dir, manifest):
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, MANIFEST)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def generate_reports(db_files, kind="week", count=1, anchor=None, formats=("png",), out_dir="reports",
+                     workers=None, force=False):
+    """
+    为每个数据库生成最近 count 个时段的报告
+    :param anchor: 最后一个时段包含的日期，默认今天
+    :param force: 忽略上次的数据摘要，全部重新渲染
+    :return: {状态: 数量}, 耗时（秒）
+    """
+    last = period_of(kind, anchor or date.today())
+    periods = [shift_period(last, -i) for i in reversed(range(count))]
+    manifest = {} if force else load_manifest(out_dir)
+
+    jobs = []
+    for db_file in db_files:
+        source = source_name(db_file)
+        for period in periods:
+            key = f"{source}/{period[0]}-{period_bounds(period)[0]}"
+            jobs.append((db_file, source, period, tuple(formats), out_dir, manifest.get(key)))
+
+    stats = {}
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        for key, digest, status in pool.map(render_report, jobs, chunksize=4):
+            if status.startswith("error"):
+                print(f"{key}: {status}")
+                stats["error"] = stats.get("error", 0) + 1
+                continue
+            manifest[key] = digest
+            stats[status] = stats.get(status, 0) + 1
+    elapsed = time.perf_counter() - started
+
+    save_manifest(out_dir, manifest)
+    return stats, elapsed
+
+
+def main(argv=None):
+    """
+    命令行入口
+    """
+    parser = argparse.ArgumentParser(description="Screen Time batch report generator")
+    parser.add_argument("--db", action="append", required=True,
+                        help="数据库文件路径，可重复指定（每个用户 / 机器一个）")
+    parser.add_argument("--period", choices=["week", "month"], default="week")
+    parser.add_argument("--count", type=int, default=1, help="生成最近几个时段的报告")
+    parser.add_argument("--date", type=parse_date, help="最后一个时段包含的日期，默认今天")
+    parser.add_argument("--formats", default="png", help=f"输出格式，逗号分隔，可选 {','.join(FORMATS)}")
+    parser.add_argument("--out", default="reports", help="输出目录")
+    parser.add_argument("--workers", type=int, help="工作进程数，默认等于 CPU 核数")
+    parser.add_argument("--force", action="store_true", help="数据未变化时也重新生成")
+    args = parser.parse_args(argv)
+
+    formats = [fmt.strip().lower() for fmt in args.formats.split(",") if fmt.strip()]
+    unknown = [fmt for fmt in formats if fmt not in FORMATS]
+    if unknown:
+        parser.error(f"unsupported format: {', '.join(unknown)}")
+
+    anchor = date.fromisoformat(args.date) if args.date else None
+    stats, elapsed = generate_reports(args.db, args.period, args.count, anchor, formats,
+                                      args.out, args.workers, args.force)
+
+    rendered = stats.get("rendered", 0)
+    summary = ", ".join(f"{count} {status}" for status, count in sorted(stats.items())) or "nothing to do"
+    print(f"{summary} in {elapsed:.2f}s ({rendered / elapsed if elapsed else 0:.1f} reports/s)")
+
+
+if __name__ == "__main__":
+    main()
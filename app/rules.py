@@ -0,0 +1,157 @@
+# rules.py
+# 应用规则引擎：分类、忽略列表、显示名称和每日使用上限
+# 规则只在加载时编译一次，每个应用的结论会被缓存，之后每次采样只做哈希查找
+import json
+import os
+import re
+from typing import Dict, List, NamedTuple, Optional
+
+# 默认规则：原先写死在 monitor_loop 中的忽略列表和 refresh_data 中的名称映射
+DEFAULT_RULES = [
+    {"match": "LockApp.exe", "ignore": True},
+    {"match": "SearchApp.exe", "ignore": True},
+    {"match": "ShellExperienceHost.exe", "ignore": True},
+    {"match": "WINWORD.EXE", "display_name": "Word"},
+    {"match": "POWERPNT.EXE", "display_name": "PowerPoint"},
+    {"match": "msedge.exe", "display_name": "Edge"},
+    {"match": "Code.exe", "display_name": "VS Code"},
+    {"match": "explorer.exe", "display_name": "桌面/文件"},
+]
+
+RULE_FIELDS = ("ignore", "category", "display_name", "limit")
+MEMO_SIZE = 4096
+
+
+class Verdict(NamedTuple):
+    """某个应用匹配全部规则后的结论"""
+    ignore: bool = False
+    category: Optional[str] = None
+    display_name: Optional[str] = None
+    limit: Optional[float] = None  # 每日上限（秒）
+
+
+def normalize(app_name: str) -> str:
+    """统一大小写并去掉 .exe 后缀，WINWORD.EXE 和 winword 视为同一应用"""
+    name = app_name.lower()
+    return name[:-4] if name.endswith(".exe") else name
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def clean_name(app_name: str) -> str:
+    """没有配置显示名称时的默认名称：去掉 .exe 并首字母大写"""
+    return app_name.replace(".exe", "").replace(".EXE", "").capitalize()
+
+
+class RuleEngine:
+    """
+    规则格式（rules.json）：
+    {
+        "rules": [
+            {"match": "steam.exe", "category": "Games"},
+            {"regex": "^chrome|firefox", "category": "Browser", "limit": 7200},
+            {"match": "LockApp.exe", "ignore": true}
+        ],
+        "category_limits": {"Games": 3600}
+    }
+    每条规则用 match（精确匹配）或 regex（正则搜索）之一，不区分大小写，.exe 后缀可省略。
+    同一字段被多条规则设置时：精确匹配优先于正则，同类规则中靠前的优先。
+    """
+
+    def __init__(self, rules: Optional[List[dict]] = None, category_limits: Optional[Dict[str, float]] = None):
+        """
+        :param rules: 规则列表，默认使用 DEFAULT_RULES
+        :param category_limits: 分类每日上限 {分类: 秒}
+        :raises ValueError: 规则格式错误
+        """
+        if not isinstance(rules, (list, type(None))):
+            raise ValueError("'rules' must be a list")
+        if not isinstance(category_limits, (dict, type(None))):
+            raise ValueError("'category_limits' must be an object")
+        self.rules = list(DEFAULT_RULES if rules is None else rules)
+        self.category_limits = dict(category_limits or {})
+        for category, limit in self.category_limits.items():
+            if not _is_number(limit):
+                raise ValueError(f"Limit of category {category!r} must be a number of seconds")
+        self._memo: Dict[str, Verdict] = {}
+        self.compile()
+
+    @classmethod
+    def from_file(cls, path="rules.json") -> "RuleEngine":
+        """从 JSON 文件加载规则；文件不存在或格式错误时使用默认规则"""
+        if not os.path.exists(path):
+            return cls()
+        try:
+            with open(path, encoding="utf-8") as f:
+                config = json.load(f)
+            if not isinstance(config, dict):
+                raise ValueError("rules file must contain a JSON object")
+            return cls(config.get("rules"), config.get("category_limits"))
+        except (OSError, ValueError, TypeError, AttributeError, re.error) as e:
+            print(f"Load rules error: {e}")
+            return cls()
+
+    def compile(self):
+        """
+        把规则编译成精确匹配哈希表和正则列表
+        :raises ValueError: 规则格式错误
+        """
+        self._exact: Dict[str, dict] = {}
+        self._patterns = []
+        for i, rule in enumerate(self.rules):
+            if not isinstance(rule, dict):
+                raise ValueError(f"Rule {i} must be an object")
+            fields = {key: rule[key] for key in RULE_FIELDS if key in rule}
+            if "limit" in fields and not _is_number(fields["limit"]):
+                raise ValueError(f"Limit in rule {i} must be a number of seconds")
+            for key in ("category", "display_name"):
+                # 分类和名称会作为字典键和显示文本，类型不对时在这里报错，而不是在每次采样时
+                if key in fields and not isinstance(fields[key], str):
+                    raise ValueError(f"'{key}' in rule {i} must be a string")
+            if "ignore" in fields and not isinstance(fields["ignore"], bool):
+                raise ValueError(f"'ignore' in rule {i} must be true or false")
+            if not isinstance(rule.get("match", rule.get("regex", "")), str):
+                raise ValueError(f"Pattern in rule {i} must be a string")
+            if "match" in rule:
+                merged = self._exact.setdefault(normalize(rule["match"]), {})
+                for key, value in fields.items():
+                    merged.setdefault(key, value)
+            elif "regex" in rule:
+                try:
+                    self._patterns.append((re.compile(rule["regex"], re.IGNORECASE), fields))
+                except re.error as e:
+                    raise ValueError(f"Invalid regex in rule {i}: {e}") from e
+            else:
+                raise ValueError(f"Rule {i} needs either 'match' or 'regex'")
+        self._memo.clear()
+
+    def verdict(self, app_name: str) -> Verdict:
+        """返回应用的规则结论，结果会被缓存"""
+        verdict = self._memo.get(app_name)
+        if verdict is not None:
+            return verdict
+
+        key = normalize(app_name)
+        fields = dict(self._exact.get(key, {}))
+        # 正则逐条搜索：每个应用只在第一次出现时执行，之后命中缓存
+        for pattern, rule_fields in self._patterns:
+            if pattern.search(key):
+                for name, value in rule_fields.items():
+                    fields.setdefault(name, value)
+
+        verdict = Verdict(**fields)
+        if len(self._memo) >= MEMO_SIZE:
+            self._memo.clear()
+        self._memo[app_name] = verdict
+        return verdict
+
+    def is_ignored(self, app_name: str) -> bool:
+        return self.verdict(app_name).ignore
+
+    def display_name(self, app_name: str) -> str:
+        return self.verdict(app_name).display_name or clean_name(app_name)
+
+    def category_limit(self, category: Optional[str]) -> Optional[float]:
+        return self.category_limits.get(category) if category else None
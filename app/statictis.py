@@ -1,15 +1,19 @@
 # statistic.py
+import asyncio
 import sqlite3
 import sys
 import threading
 from datetime import datetime
-from typing import Dict, List
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 import time
 import psutil
 import win32gui
 import win32process
 import os
 
+from plugins import PluginManager
+from rules import RuleEngine
+
 
 def resource_path(relative_path):
     """获取资源文件的绝对路径"""
@@ -22,21 +26,58 @@ def resource_path(relative_path):
 
 class AppUsageMonitor:
 
-    def __init__(self, db_file="usage_data.db"):
+    def __init__(self, db_file="usage_data.db", probe_interval=30.0, flush_interval=30.0,
+                 rules: Optional[RuleEngine] = None, plugins: Optional[PluginManager] = None):
         self.db_file = db_file
+        self.probe_interval = probe_interval  # 检查前台应用的间隔（秒）
+        self.flush_interval = flush_interval  # 把内存中的时长写入数据库的间隔（秒）
         self.running = False
         self.monitor_thread = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
 
         # 记录当前正在统计的应用状态
         self.last_active_app = None
         self.start_time = None
 
+        # 忽略列表、分类和使用上限都由规则引擎决定
+        self.rules = rules or RuleEngine()
+
+        # 插件只接收事件，在自己的线程池中执行，统计逻辑不会等待插件
+        self.plugins = plugins
+        if plugins is not None and plugins.on_quarantine is None:
+            # 采集进程没有控制台，插件被隔离时推送事件，由界面提示
+            plugins.on_quarantine = lambda name, overruns: self._notify(
+                {"type": "plugin_quarantined", "name": name, "overruns": overruns})
+
+        # 今日各应用 / 各分类的累计时长（含尚未写入数据库的部分），用于检查使用上限
+        self.totals_date = None
+        self.app_totals: Dict[str, float] = {}
+        self.category_totals: Dict[str, float] = {}
+        self._limits_notified = set()
+
+        # 已结算但尚未写入数据库的时长 {(日期, 应用名): 秒}
+        self.pending: Dict[Tuple[str, str], float] = {}
+        self._pending_lock = threading.Lock()
+
+        # 所有后台工作都以任务的形式跑在同一个事件循环里，不再额外开线程
+        self._periodic_jobs: List[Tuple[float, Callable, Optional[float]]] = []  # (间隔, 任务, 首次延迟)
+        self._services: List[Callable[[], Awaitable]] = []
+        self._tasks: List[asyncio.Task] = []
+        self._stop_event: Optional[asyncio.Event] = None
+        self._ready = threading.Event()
+
+        # 数据变化监听器，每次成功写入数据库后调用 callback(event)
+        self.data_version = 0
+        self._listeners: List[Callable[[dict], None]] = []
+
         self.init_database()
 
     def init_database(self):
         """初始化数据库表结构"""
         conn = sqlite3.connect(self.db_file)
         cursor = conn.cursor()
+        # WAL 模式下读取（查询、在线备份）不会阻塞写入
+        cursor.execute('PRAGMA journal_mode=WAL')
         cursor.execute('''
            CREATE TABLE IF NOT EXISTS app_usage(
                id INTEGER PRIMARY KEY AUTOINCREMENT,  
@@ -54,27 +95,149 @@ class AppUsageMonitor:
         conn.commit()
         conn.close()
 
-    def update_usage_data(self, app_name: str, duration: float):
-        """更新应用使用时长"""
-        # 忽略小于 1 秒的短暂切换
-        if duration < 1:
+    def flush(self):
+        """把内存中累计的时长一次性写入数据库"""
+        with self._pending_lock:
+            items = self.pending
+            self.pending = {}
+        if not items:
             return
 
-        today = datetime.now().strftime("%Y-%m-%d")
+        rows = [(app_name, date, app_name, date, duration) for (date, app_name), duration in items.items()]
         try:
             conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
-            cursor.execute('''
+            with conn:
+                conn.executemany('''
                        INSERT OR REPLACE INTO app_usage (app_name, date, usage_time)
                        VALUES (?, ?, 
                            COALESCE((SELECT usage_time FROM app_usage WHERE app_name=? AND date=?), 0) + ?
                        )
-                   ''', (app_name, today, app_name, today, duration))
-            conn.commit()
+                   ''', rows)
             conn.close()
-            # print(f"[DEBUG] Saved: {app_name} + {duration:.2f}s")
         except Exception as e:
-            print(f"Update usage error: {e}")
+            print(f"Flush usage error: {e}")
+            # 写入失败时放回内存，等下次再写
+            with self._pending_lock:
+                for key, duration in items.items():
+                    self.pending[key] = self.pending.get(key, 0) + duration
+            return
+
+        self.data_version += 1
+        self._notify({
+            "type": "data_changed",
+            "version": self.data_version,
+            "dates": sorted({date for date, _ in items}),
+        })
+        self._emit_plugin_event("flush", {
+            "version": self.data_version,
+            "usage": [{"date": date, "app_name": app_name, "duration": duration}
+                      for (date, app_name), duration in items.items()],
+        })
+
+    def _emit_plugin_event(self, event: str, payload: dict):
+        if self.plugins is not None:
+            self.plugins.emit(event, payload)
+
+    def add_listener(self, callback: Callable[[dict], None]):
+        """
+        注册事件监听器，数据写入数据库后会以 {"type": "data_changed", ...} 调用，
+        超过使用上限时会以 {"type": "limit_exceeded", ...} 调用，
+        插件被隔离时会以 {"type": "plugin_quarantined", ...} 调用
+        回调在写入数据库的线程中执行，应尽快返回
+        """
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[dict], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self, event: dict):
+        for callback in list(self._listeners):
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Listener error: {e}")
+
+    def _record(self, app_name: str, duration: float, min_duration: float = 0):
+        """
+        把一段使用时长记入内存，等待下一次 flush
+        :param min_duration: 短于该值的片段直接丢弃
+        """
+        verdict = self.rules.verdict(app_name)
+        if duration <= 0 or duration < min_duration or verdict.ignore:
+            return
+        today = datetime.now().strftime("%Y-%m-%d")
+        with self._pending_lock:
+            self.pending[(today, app_name)] = self.pending.get((today, app_name), 0) + duration
+
+        self._roll_totals(today)
+        self.app_totals[app_name] = self.app_totals.get(app_name, 0) + duration
+        if verdict.category:
+            self.category_totals[verdict.category] = self.category_totals.get(verdict.category, 0) + duration
+
+    def _roll_totals(self, today: str, load: bool = False):
+        """跨天时清空累计时长；load 为 True 时从数据库读取今日已有的数据"""
+        if today == self.totals_date and not load:
+            return
+        if self.totals_date is not None and today != self.totals_date:
+            self._emit_plugin_event("day_rollover", {"previous_date": self.totals_date, "date": today})
+        self.totals_date = today
+        self.app_totals = self.get_usage_between(today, today) if load else {}
+        self.category_totals = {}
+        for app_name, duration in self.app_totals.items():
+            category = self.rules.verdict(app_name).category
+            if category:
+                self.category_totals[category] = self.category_totals.get(category, 0) + duration
+        self._limits_notified = set()
+
+    def check_limits(self, now: float):
+        """
+        检查当前应用及其分类是否超过每日上限，每个上限每天只通知一次
+        只使用内存中的累计时长，耗时与规则数量无关
+        """
+        app_name = self.last_active_app
+        if app_name is None or self.start_time is None:
+            return
+        self._roll_totals(datetime.now().strftime("%Y-%m-%d"))
+        verdict = self.rules.verdict(app_name)
+        if verdict.ignore:
+            return
+
+        running = now - self.start_time
+        if verdict.limit is not None:
+            self._check_limit("app", app_name, self.app_totals.get(app_name, 0) + running,
+                              verdict.limit, app_name)
+        category_limit = self.rules.category_limit(verdict.category)
+        if category_limit is not None:
+            self._check_limit("category", verdict.category,
+                              self.category_totals.get(verdict.category, 0) + running,
+                              category_limit, app_name)
+
+    def _check_limit(self, scope: str, name: str, used: float, limit: float, app_name: str):
+        if used < limit or (scope, name) in self._limits_notified:
+            return
+        self._limits_notified.add((scope, name))
+        print(f"Usage limit exceeded: {name} {used:.0f}s / {limit:.0f}s")
+        self._notify({
+            "type": "limit_exceeded",
+            "scope": scope,
+            "name": name,
+            "app_name": app_name,
+            "used": used,
+            "limit": limit,
+        })
+
+    def _settle(self, now: float, switching: bool = False):
+        """
+        结算当前应用从 start_time 到 now 的时长，并重新开始计时
+        :param switching: 是否因切换应用而结算；只有这种情况才忽略小于 1 秒的短暂切换，
+                          定期 flush 切出的片段无论多短都要保留
+        """
+        if self.last_active_app is None or self.start_time is None:
+            return
+        duration = now - self.start_time
+        self.start_time = now
+        self._record(self.last_active_app, duration, min_duration=1 if switching else 0)
 
     def get_active_process_name(self) -> str:
         """
@@ -100,87 +263,173 @@ class AppUsageMonitor:
             return None
 
     # --- 保持原有查询接口不变，兼容你的 GUI ---
-    def get_today_usage(self) -> Dict[str, float]:
-        today = datetime.now().strftime("%Y-%m-%d")
+    def get_usage_between(self, start_date: str, end_date: str) -> Dict[str, float]:
+        """
+        查询 [start_date, end_date] 区间内各应用的总时长，包含尚未写入数据库的部分
+        :param start_date: 起始日期 YYYY-MM-DD
+        :param end_date: 结束日期 YYYY-MM-DD
+        """
         conn = sqlite3.connect(self.db_file)
         cursor = conn.cursor()
-        cursor.execute('SELECT app_name, usage_time FROM app_usage WHERE date = ?', (today,))
+        cursor.execute('SELECT app_name, SUM(usage_time) FROM app_usage WHERE date BETWEEN ? AND ? GROUP BY app_name',
+                       (start_date, end_date))
         results = cursor.fetchall()
         conn.close()
-        return {row[0]: row[1] for row in results}
+
+        usage = {row[0]: row[1] for row in results}
+        with self._pending_lock:
+            for (date, app_name), duration in self.pending.items():
+                if start_date <= date <= end_date:
+                    usage[app_name] = usage.get(app_name, 0) + duration
+        return usage
+
+    def get_today_usage(self) -> Dict[str, float]:
+        today = datetime.now().strftime("%Y-%m-%d")
+        return self.get_usage_between(today, today)
 
     def get_weekly_usage(self) -> Dict[str, float]:
         from datetime import timedelta
         today = datetime.now()
-        week_dates = [(today - timedelta(days=i)).strftime('%Y-%m-%d') for i in range(7)]
-        conn = sqlite3.connect(self.db_file)
-        cursor = conn.cursor()
-        placeholders = ','.join('?' * len(week_dates))
-        query = f'SELECT app_name,SUM(usage_time) FROM app_usage WHERE date IN ({placeholders}) GROUP BY app_name'
-        cursor.execute(query, week_dates)
-        results = cursor.fetchall()
-        conn.close()
-        return {row[0]: row[1] for row in results}
+        first_day = (today - timedelta(days=6)).strftime('%Y-%m-%d')
+        return self.get_usage_between(first_day, today.strftime('%Y-%m-%d'))
 
     # ... get_monthly_usage 代码保持不变 ...
 
-    def monitor_loop(self):
+    def probe_once(self, now: float):
         """
-        新的循环监控逻辑：基于焦点切换
+        基于焦点切换的统计逻辑：检查一次前台应用
         """
-        check_interval = 30.0  # 每30秒检查一次
+        current_app = self.get_active_process_name()
+        if not current_app:
+            return
 
-        # 定义不需要记录的系统进程
-        ignore_apps = ['LockApp.exe', 'SearchApp.exe', 'ShellExperienceHost.exe']
+        # 刚开始运行
+        if self.last_active_app is None:
+            self.last_active_app = current_app
+            self.start_time = now
 
-        while self.running:
-            try:
-                current_app = self.get_active_process_name()
-                now = time.time()
-
-                if not current_app:
-                    time.sleep(check_interval)
-                    continue
-
-                # 刚开始运行
-                if self.last_active_app is None:
-                    self.last_active_app = current_app
-                    self.start_time = now
-
-                # 如果切换了应用
-                elif current_app != self.last_active_app:
-                    # 1. 结算上一个应用的时间
-                    duration = now - self.start_time
-                    if self.last_active_app not in ignore_apps:
-                        self.update_usage_data(self.last_active_app, duration)
-
-                    # 2. 开始记录新应用
-                    self.last_active_app = current_app
-                    self.start_time = now
-
-                # 如果应用没变，但是时间过长（例如每隔30秒），强制保存一次，防止程序崩溃数据丢失
-                elif (now - self.start_time) > 30:
-                    duration = now - self.start_time
-                    if self.last_active_app not in ignore_apps:
-                        self.update_usage_data(self.last_active_app, duration)
-                    # 重置开始时间，避免重复叠加
-                    self.start_time = now
-
-                time.sleep(check_interval)
+        # 如果切换了应用：结算上一个应用的时间，开始记录新应用
+        elif current_app != self.last_active_app:
+            self._settle(now, switching=True)
+            self._emit_plugin_event("focus_change", {
+                "previous_app": self.last_active_app,
+                "app_name": current_app,
+                "time": now,
+            })
+            self.last_active_app = current_app
+
+        # 应用没变时由 flush 任务定期结算，防止程序崩溃数据丢失
+
+        self.check_limits(now)
 
+    async def _probe_loop(self):
+        while True:
+            try:
+                self.probe_once(time.time())
             except Exception as e:
                 print(f"Monitor loop error: {e}")
-                time.sleep(5)
+            await asyncio.sleep(self.probe_interval)
+
+    async def _flush_tick(self):
+        self._settle(time.time())
+        self.flush()
+
+    async def _run_periodic(self, interval: float, job: Callable, first_delay: Optional[float] = None):
+        delay = interval if first_delay is None else first_delay
+        while True:
+            await asyncio.sleep(delay)
+            delay = interval
+            try:
+                if asyncio.iscoroutinefunction(job):
+                    await job()
+                else:
+                    # 普通函数放到线程池里执行，避免阻塞采样和写入
+                    await asyncio.get_running_loop().run_in_executor(None, job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Periodic job error: {e}")
+
+    async def _run_service(self, factory: Callable[[], Awaitable]):
+        """常驻服务意外退出时停止监控，避免服务已经不可用却还在继续记录"""
+        try:
+            await factory()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Service error: {e}")
+        self._stop_event.set()
+
+    def _spawn(self, coro):
+        self._tasks.append(self.loop.create_task(coro))
+
+    def add_periodic_job(self, interval: float, job: Callable, first_delay: Optional[float] = None):
+        """
+        注册定期任务，每隔 interval 秒执行一次 job
+        :param job: 协程函数直接在事件循环中执行；普通函数在线程池中执行
+        :param first_delay: 启动后第一次执行前等待的秒数，默认等于 interval
+        """
+        self._periodic_jobs.append((interval, job, first_delay))
+        if self.running and self.loop is not None:
+            self.loop.call_soon_threadsafe(self._spawn, self._run_periodic(interval, job, first_delay))
+
+    def add_service(self, factory: Callable[[], Awaitable]):
+        """
+        注册常驻服务（例如 IPC 服务端），factory 是一个协程函数，停止监控时会被取消；
+        服务出错退出时监控也随之停止
+        """
+        self._services.append(factory)
+        if self.running and self.loop is not None:
+            self.loop.call_soon_threadsafe(lambda: self._spawn(self._run_service(factory)))
+
+    async def _main(self):
+        self._stop_event = asyncio.Event()
+        self._tasks = []
+        self._spawn(self._probe_loop())
+        self._spawn(self._run_periodic(self.flush_interval, self._flush_tick))
+        for interval, job, first_delay in self._periodic_jobs:
+            self._spawn(self._run_periodic(interval, job, first_delay))
+        for factory in self._services:
+            self._spawn(self._run_service(factory))
+        self._ready.set()
+
+        try:
+            await self._stop_event.wait()
+        finally:
+            # 所有等待都是可取消的 sleep，取消后立即退出
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._main())
+            self.loop.run_until_complete(self.loop.shutdown_default_executor())
+        except Exception as e:
+            print(f"Monitor loop error: {e}")
+        finally:
+            self.loop.close()
+            self._ready.set()
 
     def start_monitoring(self):
         if self.running: return
         self.running = True
-        self.monitor_thread = threading.Thread(target=self.monitor_loop, daemon=True)
+        self._roll_totals(datetime.now().strftime("%Y-%m-%d"), load=True)
+        self._ready.clear()
+        self.loop = asyncio.new_event_loop()
+        self.monitor_thread = threading.Thread(target=self._run_loop, name="AppUsageMonitor", daemon=True)
         self.monitor_thread.start()
+        self._ready.wait()
 
-    def stop_monitoring(self):
+    def stop_monitoring(self, timeout: float = 5.0):
+        if self.running and self.monitor_thread is not None and self.monitor_thread.is_alive():
+            self.loop.call_soon_threadsafe(self._stop_event.set)
+            self.monitor_thread.join(timeout)
         self.running = False
-        # 退出前保存最后一次状态
-        if self.last_active_app and self.start_time:
-            duration = time.time() - self.start_time
-            self.update_usage_data(self.last_active_app, duration)
\ No newline at end of file
+        # 事件循环退出后在当前线程结算并保存最后一次状态；结算出错也要写入已经记录的数据
+        try:
+            self._settle(time.time())
+        except Exception as e:
+            print(f"Settle error: {e}")
+        self.flush()